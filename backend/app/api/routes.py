@@ -1,10 +1,16 @@
 import json
+import os
 import re
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from uuid import uuid4
 
+try:
+    import orjson
+except ImportError:  # Optional: faster parsing of large OCR/invoice files
+    orjson = None
+
 from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
 from starlette.concurrency import run_in_threadpool
 
@@ -15,6 +21,14 @@ from app.services.ocr_service import SuryaOCRService
 
 router = APIRouter(prefix="", tags=["OCR"])
 
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+# Line item row: 00010 00028400363136 ... description ... quantity ... unit ... rate ... value
+_LINE_ITEM_RE = re.compile(
+    r'(\d{5})\s+(\d{12,14})\s+(.+?)\s+(\d+(?:,\d{3})*(?:\.\d+)?)\s+([A-Z]{1,4})\s+(\d+(?:,\d{3})*(?:\.\d+)?)\s+[A-Z]{1,4}\s+(\d+(?:,\d{3})*(?:\.\d+)?)'
+)
+_LEADING_NUMBER_RE = re.compile(r'^\d+\s+')
+
 
 @router.get("/health")
 async def healthcheck() -> dict[str, str]:
@@ -165,13 +179,12 @@ def _persist_result(result: OCRResult) -> None:
     results_dir = Path.cwd() / "results"
     results_dir.mkdir(parents=True, exist_ok=True)
 
-    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", result.filename or "document")
+    safe_name = _SAFE_NAME_RE.sub("_", result.filename or "document")
     timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
     output_path = results_dir / f"{timestamp}_{safe_name}.json"
-    payload = json.loads(result.model_dump_json(by_alias=True))
-
-    with output_path.open("w", encoding="utf-8") as handle:
-        json.dump(payload, handle, indent=2, ensure_ascii=False)
+    # pydantic's serializer already emits indented UTF-8 JSON; no need to
+    # round-trip through the json module.
+    output_path.write_text(result.model_dump_json(by_alias=True, indent=2), encoding="utf-8")
 
 
 @router.get("/invoices", summary="List all extracted invoices")
@@ -185,33 +198,11 @@ async def list_invoices() -> Dict[str, Any]:
     
     # Load successful invoices
     if successful_dir.exists():
-        for file_path in successful_dir.glob("*.json"):
-            try:
-                with file_path.open("r", encoding="utf-8") as f:
-                    data = json.load(f)
-                invoices.append({
-                    "filename": file_path.name,
-                    "data": data,
-                    "status": "successful",
-                    "modified_at": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat()
-                })
-            except Exception as e:
-                print(f"Error loading {file_path}: {e}")
+        invoices.extend(_load_invoice_dir(successful_dir, "successful"))
     
     # Load needs_review invoices
     if needs_review_dir.exists():
-        for file_path in needs_review_dir.glob("*.json"):
-            try:
-                with file_path.open("r", encoding="utf-8") as f:
-                    data = json.load(f)
-                invoices.append({
-                    "filename": file_path.name,
-                    "data": data,
-                    "status": "needs_review",
-                    "modified_at": datetime.fromtimestamp(file_path.stat().st_mtime).isoformat()
-                })
-            except Exception as e:
-                print(f"Error loading {file_path}: {e}")
+        invoices.extend(_load_invoice_dir(needs_review_dir, "needs_review"))
     
     # Sort by filename
     invoices.sort(key=lambda x: x["filename"])
@@ -219,6 +210,26 @@ async def list_invoices() -> Dict[str, Any]:
     return {"invoices": invoices}
 
 
+def _load_invoice_dir(directory: Path, status: str) -> List[Dict[str, Any]]:
+    """Load every invoice JSON in a folder, using scandir's entries for name and mtime."""
+    invoices = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.name.endswith(".json") or not entry.is_file():
+                continue
+            try:
+                data = _read_json(Path(entry.path))
+                invoices.append({
+                    "filename": entry.name,
+                    "data": data,
+                    "status": status,
+                    "modified_at": datetime.fromtimestamp(entry.stat().st_mtime).isoformat()
+                })
+            except Exception as e:
+                print(f"Error loading {entry.path}: {e}")
+    return invoices
+
+
 @router.get("/invoices/{filename:path}", summary="Get a specific invoice by filename")
 async def get_invoice(filename: str) -> Dict[str, Any]:
     """Get a specific invoice by filename from successful or needs_review folders."""
@@ -236,8 +247,7 @@ async def get_invoice(filename: str) -> Dict[str, Any]:
         raise HTTPException(status_code=404, detail=f"Invoice {filename} not found")
     
     try:
-        with file_path.open("r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = _read_json(file_path)
         
         status = "successful" if successful_dir in file_path.parents else "needs_review"
         
@@ -251,6 +261,14 @@ async def get_invoice(filename: str) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=f"Error reading invoice: {str(e)}")
 
 
+def _read_json(file_path: Path) -> Any:
+    """Load a JSON file, using orjson when it is installed."""
+    if orjson is not None:
+        return orjson.loads(file_path.read_bytes())
+    with file_path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
 def _parse_line_items_from_ocr_text(text: str) -> List[Dict[str, Any]]:
     """Parse line items from OCR text.
     
@@ -264,10 +282,7 @@ def _parse_line_items_from_ocr_text(text: str) -> List[Dict[str, Any]]:
     # The text might have the header and items in a continuous string
     
     # Look for pattern: 5-digit item number followed by 12-14 digit GTIN
-    # Pattern: 00010 00028400363136 ... description ... quantity ... unit ... rate ... value
-    pattern = r'(\d{5})\s+(\d{12,14})\s+(.+?)\s+(\d+(?:,\d{3})*(?:\.\d+)?)\s+([A-Z]{1,4})\s+(\d+(?:,\d{3})*(?:\.\d+)?)\s+[A-Z]{1,4}\s+(\d+(?:,\d{3})*(?:\.\d+)?)'
-    
-    matches = re.finditer(pattern, text)
+    matches = _LINE_ITEM_RE.finditer(text)
     
     for match in matches:
         try:
@@ -280,7 +295,7 @@ def _parse_line_items_from_ocr_text(text: str) -> List[Dict[str, Any]]:
             value = match.group(7).replace(',', '')
             
             # Clean up description (remove extra spaces, numbers at start if any)
-            description = re.sub(r'^\d+\s+', '', description)  # Remove leading numbers
+            description = _LEADING_NUMBER_RE.sub('', description)  # Remove leading numbers
             description = ' '.join(description.split())  # Normalize whitespace
             
             line_items.append({
@@ -303,7 +318,8 @@ def _parse_line_items_from_ocr_text(text: str) -> List[Dict[str, Any]]:
         # Find header row
         header_found = False
         for i, line in enumerate(lines):
-            if 'ITEM' in line.upper() and 'GTIN' in line.upper():
+            line_upper = line.upper()
+            if 'ITEM' in line_upper and 'GTIN' in line_upper:
                 header_found = True
                 # Start parsing from next line
                 for j in range(i + 1, min(i + 100, len(lines))):  # Limit to next 100 lines
@@ -429,8 +445,7 @@ async def get_invoice_ocr(filename: str) -> Dict[str, Any]:
         raise HTTPException(status_code=404, detail=f"OCR file for {filename} not found")
     
     try:
-        with ocr_file.open("r", encoding="utf-8") as f:
-            ocr_data = json.load(f)
+        ocr_data = _read_json(ocr_file)
         
         # Extract line items from OCR text
         line_items = []
@@ -1,8 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 
 from surya.ocr import run_ocr
 from surya.input.load import load_pdf
+from surya.input.processing import open_pdf
 from surya.model.detection.model import load_model as load_det_model, load_processor as load_det_processor
 from surya.model.recognition.model import load_model as load_rec_model
 from surya.model.recognition.processor import load_processor as load_rec_processor
@@ -10,6 +12,10 @@ from PIL import Image
 
 from app.schemas import OCRResult as AppOCRResult, Page, Block
 
+# Number of pages rasterised per OCR batch; the next batch is decoded while
+# the current one is being recognised.
+PAGE_CHUNK_SIZE = 4
+
 
 class SuryaOCRService:
     """Service for performing OCR on PDF documents using Surya OCR."""
@@ -75,32 +81,13 @@ class SuryaOCRService:
         if languages is None:
             languages = self.default_languages
 
-        # Load PDF images
-        images, image_names = load_pdf(str(pdf_path))
-
-        # Prepare languages - one list per image
-        langs_per_image = [languages] * len(images)
-
-        # Run OCR
-        predictions = run_ocr(
-            images,
-            langs=langs_per_image,
-            det_model=self.det_model,
-            det_processor=self.det_processor,
-            rec_model=self.rec_model,
-            rec_processor=self.rec_processor,
-        )
-
         # Build pages
         pages = []
         raw_response = {"predictions": []} if include_raw else None
 
-        for idx, (image, prediction) in enumerate(zip(images, predictions), start=1):
-            # Extract text from all text lines
-            text_lines = []
-            for text_line in prediction.text_lines:
-                text_lines.append(text_line.text)
-
+        for idx, image, prediction in self._run_ocr_by_chunk(pdf_path, languages):
+            # Extract text from all text lines once; blocks and raw output reuse it
+            text_lines = [text_line.text for text_line in prediction.text_lines]
             full_text = "\n".join(text_lines)
 
             # Get image dimensions
@@ -119,22 +106,23 @@ class SuryaOCRService:
                 if len(polygon) >= 8:
                     x_coords = [polygon[i] for i in range(0, 8, 2)]
                     y_coords = [polygon[i] for i in range(1, 8, 2)]
-                    bbox = [min(x_coords), min(y_coords), max(x_coords), max(y_coords)]
+                    bbox = [float(min(x_coords)), float(min(y_coords)), float(max(x_coords)), float(max(y_coords))]
                     # Calculate relative bbox
-                    bbox_rel = [bbox[0] / width if width > 0 else 0, 
-                               bbox[1] / height if height > 0 else 0,
-                               bbox[2] / width if width > 0 else 0,
-                               bbox[3] / height if height > 0 else 0]
+                    bbox_rel = [bbox[0] / width if width > 0 else 0.0, 
+                               bbox[1] / height if height > 0 else 0.0,
+                               bbox[2] / width if width > 0 else 0.0,
+                               bbox[3] / height if height > 0 else 0.0]
                 else:
-                    bbox = [0, 0, 0, 0]
-                    bbox_rel = [0, 0, 0, 0]
+                    bbox = [0.0, 0.0, 0.0, 0.0]
+                    bbox_rel = [0.0, 0.0, 0.0, 0.0]
                 
                 confidence = float(text_line.confidence) if hasattr(text_line, 'confidence') and text_line.confidence is not None else 1.0
 
-                block = Block(
+                # Values above already have their schema types, so skip per-line validation
+                block = Block.model_construct(
                     block_id=f"p{idx}-l{line_idx}",
                     block_type="line",
-                    text=text_line.text,
+                    text=text_lines[line_idx],
                     confidence=confidence,
                     bbox=bbox,
                     bbox_rel=bbox_rel,
@@ -157,11 +145,11 @@ class SuryaOCRService:
                     "page": idx,
                     "text_lines": [
                         {
-                            "text": tl.text,
+                            "text": text,
                             "polygon": list(tl.polygon) if hasattr(tl, 'polygon') and tl.polygon is not None else None,
                             "confidence": float(tl.confidence) if hasattr(tl, 'confidence') and tl.confidence is not None else None,
                         }
-                        for tl in prediction.text_lines
+                        for text, tl in zip(text_lines, prediction.text_lines)
                     ],
                     "languages": list(prediction.languages) if hasattr(prediction, 'languages') else languages,
                     "image_bbox": list(prediction.image_bbox) if hasattr(prediction, 'image_bbox') else [0, 0, width, height],
@@ -173,3 +161,46 @@ class SuryaOCRService:
             raw_response=raw_response if include_raw else None,
         )
 
+    def _run_ocr_by_chunk(
+        self,
+        pdf_path: Path,
+        languages: List[str],
+    ) -> Iterator[Tuple[int, Image.Image, Any]]:
+        """
+        Run OCR over a PDF in page chunks, yielding (page_number, image, prediction).
+
+        Pages are rasterised on a background thread one chunk ahead, so PDF
+        decoding overlaps with recognition of the previous chunk.
+
+        Args:
+            pdf_path: Path to the PDF file
+            languages: List of language codes applied to every page
+        """
+        pdf_file = str(pdf_path)
+        doc = open_pdf(pdf_file)
+        page_count = len(doc)
+        doc.close()
+        if page_count == 0:
+            return
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(load_pdf, pdf_file, PAGE_CHUNK_SIZE, 0)
+            for start_page in range(0, page_count, PAGE_CHUNK_SIZE):
+                images, _ = pending.result()
+
+                # Start decoding the next chunk before OCR blocks on this one
+                next_page = start_page + PAGE_CHUNK_SIZE
+                if next_page < page_count:
+                    pending = executor.submit(load_pdf, pdf_file, PAGE_CHUNK_SIZE, next_page)
+
+                predictions = run_ocr(
+                    images,
+                    langs=[languages] * len(images),
+                    det_model=self.det_model,
+                    det_processor=self.det_processor,
+                    rec_model=self.rec_model,
+                    rec_processor=self.rec_processor,
+                )
+
+                for offset, (image, prediction) in enumerate(zip(images, predictions)):
+                    yield start_page + offset + 1, image, prediction
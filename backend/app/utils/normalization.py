@@ -3,7 +3,7 @@ from __future__ import annotations
 import re
 from datetime import datetime
 from decimal import Decimal, InvalidOperation
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 
 from app.schemas import (
     FieldCandidate,
@@ -55,6 +55,38 @@ CURRENCY_WORD_MAP = {
     "cad": "CAD",
 }
 
+_CURRENCY_WORD_MAX_LEN = max(len(word) for word in CURRENCY_WORD_MAP)
+
+IDENTITY_FIELDS = ("po_number", "order_reference", "invoice_number", "vendor_name")
+DATE_FIELDS = ("po_date", "invoice_date")
+NUMERIC_FIELDS = ("subtotal", "tax_total", "grand_total")
+
+TOTALS_TOLERANCE = Decimal("0.01")
+
+_NUMBER_STRIP_RE = re.compile(r"[^\d,.\-]")
+_DATE_SEP_RE = re.compile(r"[.\-]")
+_DATE_SHAPE_RE = re.compile(r"^(\d{1,4})([-/. ])(\d{1,2}|[A-Za-z]+)\2(\d{1,4})$")
+
+
+def _date_format_shape(date_format: str) -> Tuple[str, bool, bool, bool]:
+    """Return (separator, year_first, alpha_month, four_digit_year) for a format."""
+    return (
+        date_format[2],
+        date_format.startswith("%Y"),
+        date_format[4] in "bB",
+        "%Y" in date_format,
+    )
+
+
+_DATE_FORMAT_SHAPES = {
+    date_format: _date_format_shape(date_format)
+    for date_format in (*DATE_FORMATS_DAY_FIRST, *DATE_FORMATS_MONTH_FIRST, *DATE_FORMATS_NEUTRAL)
+}
+
+
+# Result models are built with model_construct: every value comes from the
+# parsers in this module and already has its schema type, so validation is skipped.
+
 
 def normalize_document(
     candidates: Optional[Dict[str, List[FieldCandidate]]],
@@ -88,7 +120,7 @@ def normalize_document(
     if not fields and not currency_value and not totals:
         return None
 
-    summary = NormalizationSummary(
+    summary = NormalizationSummary.model_construct(
         fields=fields,
         currency=currency_value,
         totals=totals,
@@ -99,17 +131,16 @@ def normalize_document(
 def _normalise_identity_fields(
     candidates: Optional[Dict[str, List[FieldCandidate]]]
 ) -> Dict[str, NormalizedFieldValue]:
-    identity_fields = ["po_number", "order_reference", "invoice_number", "vendor_name"]
     results: Dict[str, NormalizedFieldValue] = {}
     if not candidates:
         return results
 
-    for field in identity_fields:
+    for field in IDENTITY_FIELDS:
         candidate = _select_candidate(candidates.get(field))
         if not candidate:
             continue
         metadata = _candidate_metadata(candidate)
-        results[field] = NormalizedFieldValue(
+        results[field] = NormalizedFieldValue.model_construct(
             raw=candidate.value_raw,
             normalized=candidate.value_raw.strip() if candidate.value_raw else None,
             value_type="string",
@@ -124,17 +155,16 @@ def _normalise_date_fields(
     candidates: Optional[Dict[str, List[FieldCandidate]]],
     hints: Optional[OCRDocumentHints],
 ) -> Dict[str, NormalizedFieldValue]:
-    date_fields = ["po_date", "invoice_date"]
     results: Dict[str, NormalizedFieldValue] = {}
     if not candidates:
         return results
-    for field in date_fields:
+    for field in DATE_FIELDS:
         candidate = _select_candidate(candidates.get(field))
         if not candidate:
             continue
         parsed, confidence, metadata = _parse_date(candidate.value_raw, hints)
         metadata.update(_candidate_metadata(candidate))
-        results[field] = NormalizedFieldValue(
+        results[field] = NormalizedFieldValue.model_construct(
             raw=candidate.value_raw,
             normalized=parsed,
             value_type="date" if parsed else "string",
@@ -151,7 +181,6 @@ def _normalise_numeric_fields(
 ) -> Tuple[
     Dict[str, NormalizedFieldValue], Optional[Decimal], Optional[Decimal], Optional[Decimal]
 ]:
-    numeric_fields = ["subtotal", "tax_total", "grand_total"]
     results: Dict[str, NormalizedFieldValue] = {}
     subtotal_value: Optional[Decimal] = None
     tax_value: Optional[Decimal] = None
@@ -160,7 +189,7 @@ def _normalise_numeric_fields(
     if not candidates:
         return results, subtotal_value, tax_value, grand_value
 
-    for field in numeric_fields:
+    for field in NUMERIC_FIELDS:
         candidate = _select_candidate(candidates.get(field))
         if not candidate:
             continue
@@ -169,7 +198,7 @@ def _normalise_numeric_fields(
         metadata.update(number_metadata)
         normalized_text = _decimal_to_str(value) if value is not None else None
         confidence = 1.0 if value is not None else 0.6
-        results[field] = NormalizedFieldValue(
+        results[field] = NormalizedFieldValue.model_construct(
             raw=candidate.value_raw,
             normalized=normalized_text,
             value_type="number" if value is not None else "string",
@@ -203,7 +232,7 @@ def _normalise_currency(
     metadata = {**metadata}
     if candidate:
         metadata.update(_candidate_metadata(candidate))
-    return NormalizedFieldValue(
+    return NormalizedFieldValue.model_construct(
         raw=raw_value,
         normalized=detected_currency,
         value_type="currency" if detected_currency else "string",
@@ -250,7 +279,7 @@ def _build_totals_breakdown(
         recomputed_metadata = {"source": recompute_source}
 
     if recomputed_value is not None:
-        recomputed_field = NormalizedFieldValue(
+        recomputed_field = NormalizedFieldValue.model_construct(
             raw=None,
             normalized=_decimal_to_str(recomputed_value),
             value_type="number",
@@ -264,8 +293,7 @@ def _build_totals_breakdown(
         if recomputed_value is not None:
             difference = abs(grand - recomputed_value)
             difference_value = float(difference)
-            threshold = Decimal("0.01")
-            status = "ok" if difference <= threshold else "mismatch"
+            status = "ok" if difference <= TOTALS_TOLERANCE else "mismatch"
             notes = (
                 f"Grand total {'matches' if status == 'ok' else 'differs from'} recomputed total."
             )
@@ -273,7 +301,7 @@ def _build_totals_breakdown(
     elif any(value is not None for value in (subtotal, tax, recomputed_value)):
         status = "insufficient"
 
-    totals = TotalsBreakdown(
+    totals = TotalsBreakdown.model_construct(
         subtotal=subtotal_field,
         tax_total=tax_field,
         grand_total=grand_field,
@@ -306,20 +334,23 @@ def _recompute_totals_from_tables(
     for table in tables:
         if preferred_table_ids and table.table_id not in preferred_table_ids:
             continue
-        amount_values: List[Decimal] = []
+        if table.n_cols == 0:
+            continue
+        amount_column = table.n_cols - 1
+        total_value = Decimal("0")
+        row_count = 0
         for cell in table.cells:
-            if cell.is_header or table.n_cols == 0:
+            if cell.is_header or cell.column != amount_column:
                 continue
-            if cell.column == table.n_cols - 1:
-                value, _ = _parse_number(cell.text, hints)
-                if value is not None:
-                    amount_values.append(value)
-        if amount_values:
-            total_value = sum(amount_values, start=Decimal("0"))
+            value, _ = _parse_number(cell.text, hints)
+            if value is not None:
+                total_value += value
+                row_count += 1
+        if row_count:
             metadata = {
                 "source": "table_sum",
                 "table_id": table.table_id,
-                "row_count": len(amount_values),
+                "row_count": row_count,
             }
             return total_value, metadata
     return None, {}
@@ -331,7 +362,7 @@ def _preferred_table_ids_from_candidates(
     if not candidates:
         return []
     table_ids: List[str] = []
-    for field in ("subtotal", "tax_total", "grand_total"):
+    for field in NUMERIC_FIELDS:
         for candidate in candidates.get(field, []):
             anchor_id = candidate.evidence.anchor_id
             if anchor_id and "-" in anchor_id:
@@ -363,7 +394,19 @@ def _parse_date(
         format_candidates = list(DATE_FORMATS_DAY_FIRST) + list(DATE_FORMATS_MONTH_FIRST)
     format_candidates += DATE_FORMATS_NEUTRAL
 
-    for date_format in format_candidates:
+    # Narrow the formats to those matching the input's separator and group
+    # shape so well-formed dates need a single strptime call.
+    shaped_candidates = format_candidates
+    shape_match = _DATE_SHAPE_RE.match(cleaned)
+    if shape_match:
+        first, separator, middle, last = shape_match.groups()
+        year_first = len(first) == 4
+        shape = (separator, year_first, middle.isalpha(), year_first or len(last) == 4)
+        shaped_candidates = [
+            date_format for date_format in format_candidates if _DATE_FORMAT_SHAPES[date_format] == shape
+        ] or format_candidates
+
+    for date_format in shaped_candidates:
         try:
             parsed = datetime.strptime(cleaned, date_format)
             metadata["format"] = date_format
@@ -376,7 +419,7 @@ def _parse_date(
             continue
 
     # Attempt relaxed parsing by normalising separators
-    normalised = re.sub(r"[.\-]", "/", cleaned)
+    normalised = _DATE_SEP_RE.sub("/", cleaned)
     if normalised != cleaned:
         for date_format in set(format_candidates):
             try:
@@ -405,17 +448,19 @@ def _parse_number(
     metadata["raw"] = text
 
     # Remove currency glyphs and letters except minus sign
-    cleaned = re.sub(r"[^\d,.\-]", "", text)
+    cleaned = _NUMBER_STRIP_RE.sub("", text)
 
-    if cleaned.count(",") > 0 and cleaned.count(".") > 0:
-        if cleaned.rfind(",") > cleaned.rfind("."):
+    comma_idx = cleaned.rfind(",")
+    dot_idx = cleaned.rfind(".")
+    if comma_idx >= 0 and dot_idx >= 0:
+        if comma_idx > dot_idx:
             cleaned = cleaned.replace(".", "")
             cleaned = cleaned.replace(",", ".")
             metadata["decimal_separator"] = ","
         else:
             cleaned = cleaned.replace(",", "")
             metadata["decimal_separator"] = "."
-    elif cleaned.count(",") > 0 and cleaned.count(".") == 0:
+    elif comma_idx >= 0:
         if hints and hints.numbering_style == "indian":
             cleaned = cleaned.replace(",", "")
             metadata["grouping_style"] = "indian"
@@ -441,6 +486,9 @@ def _detect_currency(
     candidate: Optional[FieldCandidate],
 ) -> Tuple[Optional[str], Dict[str, Any]]:
     metadata: Dict[str, Any] = {}
+    # When raw is the candidate's own text, its word lookup below already
+    # covers the candidate fallback.
+    raw_from_candidate = candidate is not None and raw is candidate.value_raw
     if raw:
         raw = raw.strip()
     if raw:
@@ -449,16 +497,16 @@ def _detect_currency(
                 metadata["glyph"] = glyph
                 metadata["source"] = "candidate"
                 return code, metadata
-        raw_lower = raw.lower()
-        if raw_lower in CURRENCY_WORD_MAP:
+        code = _lookup_currency_word(raw)
+        if code:
             metadata["source"] = "candidate"
-            return CURRENCY_WORD_MAP[raw_lower], metadata
+            return code, metadata
 
-    if candidate and candidate.value_raw:
-        raw_lower = candidate.value_raw.lower()
-        if raw_lower in CURRENCY_WORD_MAP:
+    if candidate and candidate.value_raw and not raw_from_candidate:
+        code = _lookup_currency_word(candidate.value_raw)
+        if code:
             metadata["source"] = "candidate"
-            return CURRENCY_WORD_MAP[raw_lower], metadata
+            return code, metadata
 
     if hints and hints.currency_glyphs:
         for glyph in hints.currency_glyphs:
@@ -470,12 +518,17 @@ def _detect_currency(
     return None, metadata
 
 
+def _lookup_currency_word(text: str) -> Optional[str]:
+    # Currency words are short ASCII tokens, so skip lowercasing anything longer.
+    if len(text) > _CURRENCY_WORD_MAX_LEN or not text.isascii():
+        return None
+    return CURRENCY_WORD_MAP.get(text.lower())
+
+
 def _select_candidate(
-    candidate_list: Optional[Iterable[FieldCandidate]],
+    candidate_list: Optional[Sequence[FieldCandidate]],
 ) -> Optional[FieldCandidate]:
-    if not candidate_list:
-        return None
-    return next(iter(candidate_list), None)
+    return candidate_list[0] if candidate_list else None
 
 
 def _candidate_metadata(candidate: FieldCandidate) -> Dict[str, Any]:
@@ -507,7 +560,7 @@ def _field_from_results(
     if not candidate:
         return None
     metadata = _candidate_metadata(candidate)
-    return NormalizedFieldValue(
+    return NormalizedFieldValue.model_construct(
         raw=candidate.value_raw,
         normalized=candidate.value_raw.strip() if candidate.value_raw else None,
         value_type="string",
@@ -4,6 +4,7 @@ Create a numbered mapping (1-200) of all PDFs in PickSample200.
 This recreates the mapping used by the Gemini processing.
 """
 import json
+import os
 from pathlib import Path
 
 def create_pdf_mapping():
@@ -17,8 +18,13 @@ def create_pdf_mapping():
         print(f"❌ Error: {pdf_dir} not found!")
         return {}
     
-    # Get all PDF files (case-insensitive)
-    pdf_files = sorted(list(pdf_dir.glob("*.pdf")) + list(pdf_dir.glob("*.PDF")))
+    # Get all PDF files (.pdf / .PDF) in a single directory scan; each entry is seen
+    # once, so case-insensitive filesystems no longer list a file twice
+    with os.scandir(pdf_dir) as entries:
+        pdf_files = sorted(
+            Path(entry.path) for entry in entries
+            if entry.name.endswith((".pdf", ".PDF")) and entry.is_file()
+        )
     
     print(f"📁 Found {len(pdf_files)} PDF files in PickSample200")
     print()
@@ -60,18 +66,22 @@ def find_missing_pdf_files():
     print()
     
     missing_files_info = []
+    lines = []  # Listing is written in one go rather than one print per file
     
     for num in sorted(missing_numbers):
         if num in mapping:
             filename = mapping[num]
-            print(f"  {num:3d}. {filename}")
+            lines.append(f"  {num:3d}. {filename}")
             missing_files_info.append({
                 "number": num,
                 "filename": filename,
                 "path": f"backend/PickSample200/{filename}"
             })
         else:
-            print(f"  {num:3d}. [NUMBER OUT OF RANGE]")
+            lines.append(f"  {num:3d}. [NUMBER OUT OF RANGE]")
+    
+    if lines:
+        print("\n".join(lines))
     
     # Save results
     output_json = "missing_pdfs_mapping.json"
@@ -118,22 +118,37 @@ def delete_redundant_files():
     not_found_count = 0
     error_count = 0
     
-    for filename in FILES_TO_DELETE:
-        file_path = gemini_dir / filename
-        
-        if file_path.exists():
-            try:
-                file_path.unlink()
-                deleted_count += 1
-                if deleted_count % 10 == 0:
-                    print(f"  Progress: {deleted_count}/{len(FILES_TO_DELETE)} files deleted...")
-            except Exception as e:
-                print(f"❌ Error deleting {filename}: {e}")
-                error_count += 1
-        else:
-            not_found_count += 1
-            if not_found_count <= 5:  # Only show first 5 missing files
-                print(f"⚠️  File not found (already deleted?): {filename}")
+    # One directory read serves both the existence checks and the final count
+    with os.scandir(gemini_dir) as entries:
+        existing = {entry.name for entry in entries}
+    json_count = sum(1 for name in existing if name.endswith(".json"))
+    
+    # Unlink relative to an open directory fd so the path isn't re-resolved per file
+    use_dir_fd = os.unlink in os.supports_dir_fd
+    dir_fd = os.open(gemini_dir, os.O_RDONLY) if use_dir_fd else None
+    try:
+        for filename in FILES_TO_DELETE:
+            if filename in existing:
+                try:
+                    if use_dir_fd:
+                        os.unlink(filename, dir_fd=dir_fd)
+                    else:
+                        os.unlink(gemini_dir / filename)
+                    deleted_count += 1
+                    if filename.endswith(".json"):
+                        json_count -= 1
+                    if deleted_count % 10 == 0:
+                        print(f"  Progress: {deleted_count}/{len(FILES_TO_DELETE)} files deleted...")
+                except Exception as e:
+                    print(f"❌ Error deleting {filename}: {e}")
+                    error_count += 1
+            else:
+                not_found_count += 1
+                if not_found_count <= 5:  # Only show first 5 missing files
+                    print(f"⚠️  File not found (already deleted?): {filename}")
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
     
     print("="*70)
     print("✅ CLEANUP COMPLETE")
@@ -144,10 +159,9 @@ def delete_redundant_files():
     print(f"Total processed:   {len(FILES_TO_DELETE)}")
     print("="*70)
     
-    # Verify final count
-    remaining_files = list(gemini_dir.glob("*.json"))
+    # Final count from the same snapshot, less what was deleted
     print(f"\n📊 Final Status:")
-    print(f"Files remaining in folder: {len(remaining_files)}")
+    print(f"Files remaining in folder: {json_count}")
     print(f"Expected after cleanup:    163")
     print("="*70)
 
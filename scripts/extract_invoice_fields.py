@@ -4,101 +4,221 @@ Comprehensive Invoice Field Extraction Script
 Processes all 200 OCR JSON files and extracts structured fields
 """
 
+import contextlib
+import functools
+import hashlib
+import io
 import json
+import multiprocessing
 import os
 import re
+import sys
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # Optional: faster reads of OCR files and writes of results
+    orjson = None
+
+
+@functools.lru_cache(maxsize=None)
+def _uppercase_twin(pattern: re.Pattern) -> re.Pattern:
+    """The same pattern without re.IGNORECASE, for matching uppercased text"""
+    return re.compile(pattern.pattern, pattern.flags & ~re.IGNORECASE)
+
+
+def _factored_alternation(codes) -> str:
+    """Regex alternation of two-letter codes grouped by first letter: CA|CO|CT -> C[AOT]"""
+    by_first = {}
+    for code in codes:
+        by_first.setdefault(code[0], []).append(code[1])
+    return '|'.join(
+        first + (f"[{''.join(rest)}]" if len(rest) > 1 else rest[0])
+        for first, rest in by_first.items()
+    )
+
+
 class InvoiceFieldExtractor:
     """Extract and validate invoice fields from OCR JSON files"""
     
+    US_STATE_CODES = (
+        'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA', 'KS', 'KY',
+        'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND',
+        'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA', 'WV', 'WI', 'WY',
+    )
+    # One branch per first letter instead of 50 two-letter branches tried in turn
+    US_STATE_ALTERNATION = _factored_alternation(US_STATE_CODES)
+    
+    # Patterns are compiled once per process and tried in order (first match wins).
+    # Each is paired with its literal needles: it can only match uppercased text
+    # that contains one of them (no needles means it is always tried)
+    PO_PATTERNS = tuple((re.compile(p, re.IGNORECASE | re.MULTILINE), needles) for p, needles in (
+        (r'PO[:\s#]*([A-Z0-9\-]+)', ('PO',)),
+        (r'P\.?O\.?[:\s#]*([A-Z0-9\-]+)', ()),
+        (r'PURCHASE\s+ORDER[:\s#]*([A-Z0-9\-]+)', ('PURCHASE',)),
+        (r'CUSTOMER\s+PO[:\s#]*([A-Z0-9\-]+)', ('CUSTOMER',)),
+        (r'ORDER\s+NUMBER[:\s#]*([0-9]+)', ('ORDER',)),
+        (r'PO:\s*([A-Z0-9\-]+)', ('PO:',)),
+        (r'^([A-Z]\d{5})(?:\s|$)', ()),  # Pattern like B34200
+    ))
+    ORDER_ID_PATTERNS = tuple((re.compile(p, re.IGNORECASE), needles) for p, needles in (
+        (r'ORDER\s+NUMBER[:\s]*([0-9]+)', ('ORDER',)),
+        (r'ORDER[:\s#]*([0-9]{8,})', ('ORDER',)),
+        (r'CUST#[:\s]*([0-9]+)', ('CUST#',)),
+        (r'CUSTOMER\s+NUMBER[:\s]*([0-9]+)', ('CUSTOMER',)),
+        (r'ORDER\s+ID[:\s]*([A-Z0-9]+)', ('ORDER',)),
+    ))
+    RDD_PATTERNS = tuple((re.compile(p, re.IGNORECASE), needles) for p, needles in (
+        (r'DELIVERY\s+DATE[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})', ('DELIVERY',)),
+        (r'ARRIVAL\s+DATE[:\s]*\|?([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})', ('ARRIVAL',)),
+        (r'RDD[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})', ('RDD',)),
+        (r'REQUESTED\s+DELIVERY[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})', ('REQUESTED',)),
+        (r'DEL(?:IVERY)?\s+(?:DATE)?[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})', ('DEL',)),
+    ))
+    # The first needle of each address pattern is also where its match starts
+    SHIPPING_ADDRESS_PATTERNS = tuple((re.compile(p, re.IGNORECASE | re.MULTILINE), needles) for p, needles in (
+        (r'SHIP\s+TO[:\s]*\n?([^\n]+(?:\n[^\n]+){0,3})', ('SHIP',)),
+        (r'SHIP\s+TO[:\s]*([A-Z0-9\s,\.\-]+(?:' + US_STATE_ALTERNATION + r')\s+\d{5})', ('SHIP',)),
+        (r'DELIVER\s+TO[:\s]*\n?([^\n]+(?:\n[^\n]+){0,3})', ('DELIVER',)),
+    ))
+    BILLING_ADDRESS_PATTERNS = tuple((re.compile(p, re.IGNORECASE | re.MULTILINE), needles) for p, needles in (
+        (r'SOLD\s+TO[:\s]*\n?([^\n]+(?:\n[^\n]+){0,3})', ('SOLD',)),
+        (r'BILL\s+TO[:\s]*\n?([^\n]+(?:\n[^\n]+){0,3})', ('BILL',)),
+        (r'BILLING\s+ADDRESS[:\s]*\n?([^\n]+(?:\n[^\n]+){0,3})', ('BILLING',)),
+    ))
+    
+    # Material IDs: GTIN codes, labelled item codes (V17741, 70766, ...) and table product codes
+    GTIN_RE = re.compile(r'(?:^|\s)([0-9]{12,14})(?:\s|$)', re.MULTILINE)
+    ITEM_CODE_RE = re.compile(r'(?:SUPPLIER CODE|AVI CODE|ITEM|CODE)[:\s]*([A-Z0-9]+)', re.IGNORECASE)
+    TABLE_CODE_RE = re.compile(r'^([A-Z]?\d{5,})(?:\s+[A-Z])', re.MULTILINE)
+    MATERIAL_ID_PATTERNS = ((GTIN_RE, ()), (ITEM_CODE_RE, ('CODE', 'ITEM')), (TABLE_CODE_RE, ()))
+    
+    # Line item counting: item number + GTIN rows, QTY with CS/EA units, L/N entries.
+    # Only match counts are used, so the QTY pattern starts at the last digit of
+    # the quantity instead of backtracking over the whole run at every digit
+    LINE_ITEM_PATTERNS = (
+        (re.compile(r'^(?:[0-9]{5,})\s+[0-9]{12,14}', re.MULTILINE), ()),
+        (re.compile(r'\d\s+(?:CS|EA|CASE|EACH)\s+[\d\.]+', re.IGNORECASE), ('CS', 'EA', 'CASE')),
+        (re.compile(r'^L/N\s+\d+', re.MULTILINE), ('L/N',)),
+    )
+    
+    FILE_NUMBER_RE = re.compile(r'_(\d+)\.pdf')
+    
+    # Recorded in the manifest; bump when patterns, the output format or the manifest layout change
+    EXTRACTOR_VERSION = 2
+    
+    # Errors are streamed to a log file; only the first few are kept for the console summary
+    ERRORS_SHOWN = 10
+    
+    # Progress lines are written to stdout in batches of this many files
+    PROGRESS_BATCH = 20
+    
+    # Address searches start at the pattern's first needle
+    ADDRESS_ANCHORS = {
+        pattern: needles[0] for pattern, needles in SHIPPING_ADDRESS_PATTERNS + BILLING_ADDRESS_PATTERNS
+    }
+    
     def __init__(self, input_dir: str, output_dir: str):
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
+        self.error_log_path = self.output_dir / "extraction_errors.log"
+        self.manifest_path = self.output_dir / "extraction_manifest.json"
         
     def extract_text_from_ocr(self, ocr_data: Dict) -> str:
         """Extract all text from OCR JSON"""
         try:
-            text_parts = []
-            if 'pages' in ocr_data:
-                for page in ocr_data['pages']:
-                    if 'text' in page:
-                        text_parts.append(page['text'])
-            return '\n'.join(text_parts)
+            pages = ocr_data['pages'] if 'pages' in ocr_data else ()
+            return '\n'.join(page['text'] for page in pages if 'text' in page)
         except Exception as e:
             print(f"Error extracting text: {e}")
             return ""
     
-    def extract_po_number(self, text: str) -> Optional[str]:
-        """Extract Purchase Order number"""
-        patterns = [
-            r'PO[:\s#]*([A-Z0-9\-]+)',
-            r'P\.?O\.?[:\s#]*([A-Z0-9\-]+)',
-            r'PURCHASE\s+ORDER[:\s#]*([A-Z0-9\-]+)',
-            r'CUSTOMER\s+PO[:\s#]*([A-Z0-9\-]+)',
-            r'ORDER\s+NUMBER[:\s#]*([0-9]+)',
-            r'PO:\s*([A-Z0-9\-]+)',
-            r'(?:^|\n)([A-Z]\d{5})(?:\s|$)',  # Pattern like B34200
+    @staticmethod
+    def _candidate_patterns(patterns, text: str, text_upper: Optional[str] = None):
+        """The patterns from (pattern, needles) pairs that can match text, in order.
+        
+        Patterns whose literal anchors are all missing from the text are
+        skipped, so the regex engine does not walk the whole text for them.
+        The screen only runs on ASCII text, where case folding is exact.
+        Pass text_upper when the caller already has text.upper().
+        """
+        if not text.isascii():
+            return [pattern for pattern, _ in patterns]
+        if text_upper is None:
+            text_upper = text.upper()
+        return [
+            pattern for pattern, needles in patterns
+            if not needles or any(needle in text_upper for needle in needles)
         ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+    
+    @staticmethod
+    def _caseless(pattern: re.Pattern, text: str, text_upper: Optional[str] = None):
+        """The (pattern, subject) pair to match with; spans are valid offsets into text.
+        
+        re.IGNORECASE folds case character by character inside the matcher and
+        rules out its literal-prefix scans. Case-insensitive patterns are all
+        written in uppercase, so on ASCII text (where text.upper() keeps every
+        offset) their flagless twin runs against the uppercased text instead.
+        Captures are then sliced from text to keep the original case.
+        """
+        if pattern.flags & re.IGNORECASE and text.isascii():
+            return _uppercase_twin(pattern), text_upper if text_upper is not None else text.upper()
+        return pattern, text
+    
+    def _search_address(self, pattern: re.Pattern, text: str, text_upper: Optional[str] = None):
+        """Search for an address pattern, starting at the first occurrence of its anchor.
+        
+        No match can begin before the anchor word, so on ASCII text the scan
+        skips straight to it.
+        """
+        anchor = self.ADDRESS_ANCHORS[pattern]
+        pattern, subject = self._caseless(pattern, text, text_upper)
+        if subject is text:
+            return pattern.search(text)
+        start = subject.find(anchor)
+        return pattern.search(subject, start) if start >= 0 else None
+    
+    def extract_po_number(self, text: str, text_upper: Optional[str] = None) -> Optional[str]:
+        """Extract Purchase Order number"""
+        for pattern in self._candidate_patterns(self.PO_PATTERNS, text, text_upper):
+            pattern, subject = self._caseless(pattern, text, text_upper)
+            match = pattern.search(subject)
             if match:
-                po = match.group(1).strip()
+                po = text[match.start(1):match.end(1)].strip()
                 if len(po) >= 3:  # Minimum PO length
                     return po
         return None
     
-    def extract_order_id(self, text: str) -> Optional[str]:
+    def extract_order_id(self, text: str, text_upper: Optional[str] = None) -> Optional[str]:
         """Extract Source Order ID"""
-        patterns = [
-            r'ORDER\s+NUMBER[:\s]*([0-9]+)',
-            r'ORDER[:\s#]*([0-9]{8,})',
-            r'CUST#[:\s]*([0-9]+)',
-            r'CUSTOMER\s+NUMBER[:\s]*([0-9]+)',
-            r'ORDER\s+ID[:\s]*([A-Z0-9]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in self._candidate_patterns(self.ORDER_ID_PATTERNS, text, text_upper):
+            pattern, subject = self._caseless(pattern, text, text_upper)
+            match = pattern.search(subject)
             if match:
-                order_id = match.group(1).strip()
+                order_id = text[match.start(1):match.end(1)].strip()
                 if len(order_id) >= 5:
                     return order_id
         return None
     
-    def extract_rdd(self, text: str) -> Optional[str]:
+    def extract_rdd(self, text: str, text_upper: Optional[str] = None) -> Optional[str]:
         """Extract Requested Delivery Date"""
-        patterns = [
-            r'DELIVERY\s+DATE[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})',
-            r'ARRIVAL\s+DATE[:\s]*\|?([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})',
-            r'RDD[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})',
-            r'REQUESTED\s+DELIVERY[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})',
-            r'DEL(?:IVERY)?\s+(?:DATE)?[:\s]*([0-9]{1,2}[\/\-][0-9]{1,2}[\/\-][0-9]{2,4})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in self._candidate_patterns(self.RDD_PATTERNS, text, text_upper):
+            pattern, subject = self._caseless(pattern, text, text_upper)
+            match = pattern.search(subject)
             if match:
-                date_str = match.group(1).strip()
+                date_str = text[match.start(1):match.end(1)].strip()
                 return date_str
         return None
     
-    def extract_shipping_address(self, text: str) -> Optional[str]:
+    def extract_shipping_address(self, text: str, text_upper: Optional[str] = None) -> Optional[str]:
         """Extract Shipping Address"""
-        patterns = [
-            r'SHIP\s+TO[:\s]*\n?([^\n]+(?:\n[^\n]+){0,3})',
-            r'SHIP\s+TO[:\s]*([A-Z0-9\s,\.\-]+(?:AL|AK|AZ|AR|CA|CO|CT|DE|FL|GA|HI|ID|IL|IN|IA|KS|KY|LA|ME|MD|MA|MI|MN|MS|MO|MT|NE|NV|NH|NJ|NM|NY|NC|ND|OH|OK|OR|PA|RI|SC|SD|TN|TX|UT|VT|VA|WA|WV|WI|WY)\s+\d{5})',
-            r'DELIVER\s+TO[:\s]*\n?([^\n]+(?:\n[^\n]+){0,3})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in self._candidate_patterns(self.SHIPPING_ADDRESS_PATTERNS, text, text_upper):
+            match = self._search_address(pattern, text, text_upper)
             if match:
-                address = match.group(1).strip()
+                address = text[match.start(1):match.end(1)].strip()
                 # Clean up and limit to reasonable length
                 address_lines = [line.strip() for line in address.split('\n') if line.strip()]
                 address = ', '.join(address_lines[:4])  # Max 4 lines
@@ -106,69 +226,39 @@ class InvoiceFieldExtractor:
                     return address
         return None
     
-    def extract_billing_address(self, text: str) -> Optional[str]:
+    def extract_billing_address(self, text: str, text_upper: Optional[str] = None) -> Optional[str]:
         """Extract Billing Address"""
-        patterns = [
-            r'SOLD\s+TO[:\s]*\n?([^\n]+(?:\n[^\n]+){0,3})',
-            r'BILL\s+TO[:\s]*\n?([^\n]+(?:\n[^\n]+){0,3})',
-            r'BILLING\s+ADDRESS[:\s]*\n?([^\n]+(?:\n[^\n]+){0,3})',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
+        for pattern in self._candidate_patterns(self.BILLING_ADDRESS_PATTERNS, text, text_upper):
+            match = self._search_address(pattern, text, text_upper)
             if match:
-                address = match.group(1).strip()
+                address = text[match.start(1):match.end(1)].strip()
                 address_lines = [line.strip() for line in address.split('\n') if line.strip()]
                 address = ', '.join(address_lines[:4])
                 if len(address) > 15:
                     return address
         return None
     
-    def extract_material_ids(self, text: str) -> List[str]:
+    def extract_material_ids(self, text: str, text_upper: Optional[str] = None) -> List[str]:
         """Extract Material IDs/SKUs from invoice"""
-        material_ids = []
-        
-        # Pattern for GTIN codes (common in the invoices)
-        gtin_pattern = r'(?:^|\s)([0-9]{12,14})(?:\s|$)'
-        gtin_matches = re.findall(gtin_pattern, text, re.MULTILINE)
-        
-        # Pattern for item codes like V17741, 70766, etc.
-        item_code_pattern = r'(?:SUPPLIER CODE|AVI CODE|ITEM|CODE)[:\s]*([A-Z0-9]+)'
-        item_matches = re.findall(item_code_pattern, text, re.IGNORECASE)
-        
-        # Pattern for product codes in tables
-        table_pattern = r'(?:^|\n)([A-Z]?\d{5,})(?:\s+[A-Z])'
-        table_matches = re.findall(table_pattern, text, re.MULTILINE)
-        
-        # Combine all matches and deduplicate
-        all_ids = gtin_matches + item_matches + table_matches
-        seen = set()
-        for id_val in all_ids:
-            if id_val and len(id_val) >= 4 and id_val not in seen:
-                material_ids.append(id_val)
-                seen.add(id_val)
-        
-        return material_ids
+        # GTIN codes, then item codes, then table product codes
+        all_ids = []
+        for pattern in self._candidate_patterns(self.MATERIAL_ID_PATTERNS, text, text_upper):
+            pattern, subject = self._caseless(pattern, text, text_upper)
+            if subject is text:
+                all_ids.extend(pattern.findall(text))
+            else:
+                all_ids.extend(text[match.start(1):match.end(1)] for match in pattern.finditer(subject))
+        
+        # Deduplicate, keeping first occurrence
+        return [id_val for id_val in dict.fromkeys(all_ids) if len(id_val) >= 4]
     
-    def count_line_items(self, text: str) -> int:
+    def count_line_items(self, text: str, text_upper: Optional[str] = None) -> int:
         """Count the number of line items in the invoice"""
-        # Look for table-like structures with items
+        # Look for table-like structures with items; the best-matching pattern wins
         line_count = 0
-        
-        # Pattern 1: Lines starting with item numbers
-        pattern1 = r'(?:^|\n)(?:[0-9]{5,})\s+[0-9]{12,14}'
-        matches1 = re.findall(pattern1, text, re.MULTILINE)
-        line_count = max(line_count, len(matches1))
-        
-        # Pattern 2: Lines with QTY and CS/EA patterns
-        pattern2 = r'\d+\s+(?:CS|EA|CASE|EACH)\s+[\d\.]+'
-        matches2 = re.findall(pattern2, text, re.IGNORECASE)
-        line_count = max(line_count, len(matches2))
-        
-        # Pattern 3: Count L/N entries
-        pattern3 = r'(?:^|\n)L/N\s+\d+'
-        matches3 = re.findall(pattern3, text, re.MULTILINE)
-        line_count = max(line_count, len(matches3))
+        for pattern in self._candidate_patterns(self.LINE_ITEM_PATTERNS, text, text_upper):
+            pattern, subject = self._caseless(pattern, text, text_upper)
+            line_count = max(line_count, len(pattern.findall(subject)))
         
         return line_count
     
@@ -185,13 +275,15 @@ class InvoiceFieldExtractor:
         
         return validation
     
-    def extract_all_fields(self, ocr_file_path: Path) -> Dict[str, Any]:
-        """Extract all fields from a single OCR file"""
+    def extract_all_fields(self, ocr_file_path: Path, raw: Optional[bytes] = None) -> Dict[str, Any]:
+        """Extract all fields from a single OCR file (raw: its bytes, if the caller already read them)"""
         
         # Load OCR data
         try:
-            with open(ocr_file_path, 'r', encoding='utf-8') as f:
-                ocr_data = json.load(f)
+            if raw is None:
+                with open(ocr_file_path, 'rb') as f:
+                    raw = f.read()
+            ocr_data = orjson.loads(raw) if orjson is not None else json.loads(raw)
         except Exception as e:
             print(f"Error reading {ocr_file_path}: {e}")
             return None
@@ -206,14 +298,15 @@ class InvoiceFieldExtractor:
             print(f"No text extracted from {filename}")
             return None
         
-        # Extract all fields
-        po_number = self.extract_po_number(text)
-        source_order_id = self.extract_order_id(text)
-        rdd = self.extract_rdd(text)
-        shipping_address = self.extract_shipping_address(text)
-        billing_address = self.extract_billing_address(text)
-        material_ids = self.extract_material_ids(text)
-        line_item_count = self.count_line_items(text)
+        # Extract all fields (uppercasing once for all extractors)
+        text_upper = text.upper()
+        po_number = self.extract_po_number(text, text_upper)
+        source_order_id = self.extract_order_id(text, text_upper)
+        rdd = self.extract_rdd(text, text_upper)
+        shipping_address = self.extract_shipping_address(text, text_upper)
+        billing_address = self.extract_billing_address(text, text_upper)
+        material_ids = self.extract_material_ids(text, text_upper)
+        line_item_count = self.count_line_items(text, text_upper)
         
         # Validations
         po_validation = self.validate_po_number(po_number)
@@ -251,63 +344,193 @@ class InvoiceFieldExtractor:
         
         return result
     
-    def process_all_files(self) -> Dict[str, Any]:
+    def _process_one(self, json_file: Path):
+        """
+        Extract one file (runs in a worker process); returns (result, error, entry, output)
+        entry is the file's manifest entry, hashed from the bytes that were extracted;
+        output is what the extraction printed, handed back so the parent prints it in order
+        """
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            try:
+                with open(json_file, 'rb') as f:
+                    # Stat before reading: if the file changes meanwhile, the next run sees a new mtime
+                    st = os.fstat(f.fileno())
+                    raw = f.read()
+                entry = self._manifest_entry(st, self._input_hash(raw))
+            except OSError:
+                raw, entry = None, None  # extract_all_fields reports the read error
+            try:
+                result, error = self.extract_all_fields(json_file, raw), None
+            except Exception as e:
+                result, error = None, str(e)
+        return result, error, entry, output.getvalue()
+    
+    @staticmethod
+    def _input_hash(data: bytes) -> str:
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+    
+    @staticmethod
+    def _manifest_entry(st: os.stat_result, input_hash: str) -> Dict[str, Any]:
+        return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': input_hash}
+    
+    def _unchanged_entry(self, json_file: Path, entry: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        The manifest entry for json_file if it is unchanged since its output was written, else None
+        Size and mtime are checked first; the file is only read and hashed when its mtime moved but its size did not
+        """
+        if not entry or not (self.output_dir / f"{json_file.stem}_extracted.json").exists():
+            return None
+        st = json_file.stat()
+        if st.st_size != entry['size']:
+            return None
+        if st.st_mtime_ns != entry['mtime_ns']:
+            input_hash = self._input_hash(json_file.read_bytes())
+            if input_hash != entry['hash']:
+                return None
+            entry = self._manifest_entry(st, input_hash)
+        return entry
+    
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        """Manifest entries (size, mtime_ns, hash) of files extracted by a previous run of this extractor version"""
+        try:
+            with open(self.manifest_path, 'rb') as f:
+                manifest = json.loads(f.read())
+        except (OSError, ValueError):
+            return {}
+        if manifest.get('extractor_version') != self.EXTRACTOR_VERSION:
+            return {}
+        return manifest.get('files', {})
+    
+    def process_all_files(self, workers: Optional[int] = None, skip_unchanged: bool = True) -> Dict[str, Any]:
         """Process all OCR files in the input directory"""
         
         # Get all JSON files sorted by number
-        json_files = sorted(
-            self.input_dir.glob('*.json'),
-            key=lambda x: self._extract_number_from_filename(x.name)
-        )
+        with os.scandir(self.input_dir) as entries:
+            json_files = sorted(
+                (Path(entry.path) for entry in entries
+                 if entry.name.endswith('.json') and entry.is_file()),
+                key=lambda x: self._extract_number_from_filename(x.name)
+            )
         
         print(f"Found {len(json_files)} JSON files to process")
         
+        # Skip inputs whose content is unchanged since their output was written
+        previous = self._load_manifest() if skip_unchanged else {}
+        manifest = {}
+        todo = []
+        for json_file in json_files:
+            entry = self._unchanged_entry(json_file, previous.get(json_file.name))
+            if entry is not None:
+                manifest[json_file.name] = entry
+            else:
+                todo.append(json_file)
+        skipped = len(json_files) - len(todo)
+        if skipped:
+            print(f"Skipping {skipped} unchanged files already extracted in {self.output_dir}")
+        
         stats = {
             'total': 0,
             'successful': 0,
             'failed': 0,
-            'errors': []
+            'skipped': skipped,
+            'error_count': 0,
+            'errors': []  # First ERRORS_SHOWN only; the full list is in error_log_path
         }
         
-        for idx, json_file in enumerate(json_files, 1):
-            print(f"Processing [{idx}/{len(json_files)}]: {json_file.name}")
-            
-            try:
-                result = self.extract_all_fields(json_file)
-                
-                if result:
-                    # Create output filename
-                    output_filename = f"{json_file.stem}_extracted.json"
-                    output_path = self.output_dir / output_filename
-                    
-                    # Write result
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        json.dump(result, f, indent=2, ensure_ascii=False)
-                    
-                    stats['successful'] += 1
+        # Extraction is pure CPU work per file, so fan it out across processes;
+        # results come back in input order and are written here
+        workers = min(workers or os.cpu_count() or 1, len(todo))
+        pool = multiprocessing.Pool(workers) if workers > 1 else None
+        if pool is not None:
+            outcomes = pool.imap(self._process_one, todo, chunksize=8)
+        else:
+            outcomes = map(self._process_one, todo)
+        
+        stdout = sys.stdout
+        progress = io.StringIO()
+        try:
+            with open(self.error_log_path, 'w', encoding='utf-8') as error_log, contextlib.redirect_stdout(progress):
+                for idx, json_file in enumerate(todo, 1):
+                    print(f"Processing [{idx}/{len(todo)}]: {json_file.name}")
+                    result, error, entry, output = next(outcomes)
+                    print(output, end='')
+                    if self._record_outcome(json_file, result, error, stats, error_log) and entry is not None:
+                        manifest[json_file.name] = entry
                     
-                    # Print summary
-                    po = result['Invoice_Header_Fields']['PONumber']
-                    mat_count = result['Line_Item_Fields']['MaterialIDCount']
-                    all_fields = result['Validation_and_Quality_Checks']['All Mandatory Fields extracted']
-                    print(f"  ✓ PO: {po}, Materials: {mat_count}, Complete: {all_fields}")
-                else:
-                    stats['failed'] += 1
-                    stats['errors'].append(f"{json_file.name}: No data extracted")
-                    print(f"  ✗ Failed to extract data")
+                    if idx % self.PROGRESS_BATCH == 0:
+                        stdout.write(progress.getvalue())
+                        progress.seek(0)
+                        progress.truncate()
+        finally:
+            if pool is not None:
+                pool.terminate()
+            stdout.write(progress.getvalue())
+            self._write_json(self.manifest_path, {
+                'extractor_version': self.EXTRACTOR_VERSION,
+                'files': manifest,
+            })
+        
+        return stats
+    
+    def _record_error(self, stats: Dict[str, Any], error_log, message: str):
+        """Count a failed file and append its error to the log"""
+        stats['failed'] += 1
+        stats['error_count'] += 1
+        if len(stats['errors']) < self.ERRORS_SHOWN:
+            stats['errors'].append(message)
+        error_log.write(f"{message}\n")
+    
+    def _record_outcome(self, json_file: Path, result: Optional[Dict[str, Any]], error: Optional[str],
+                        stats: Dict[str, Any], error_log) -> bool:
+        """Write one file's result and update the run statistics; returns True if written"""
+        if error is not None:
+            self._record_error(stats, error_log, f"{json_file.name}: {error}")
+            print(f"  ✗ Error: {error}")
+            return False
+        
+        written = False
+        try:
+            if result:
+                # Create output filename
+                output_filename = f"{json_file.stem}_extracted.json"
+                output_path = self.output_dir / output_filename
                 
-                stats['total'] += 1
+                # Write result
+                self._write_json(output_path, result)
+                written = True
                 
-            except Exception as e:
-                stats['failed'] += 1
-                stats['errors'].append(f"{json_file.name}: {str(e)}")
-                print(f"  ✗ Error: {e}")
+                stats['successful'] += 1
+                
+                # Print summary
+                po = result['Invoice_Header_Fields']['PONumber']
+                mat_count = result['Line_Item_Fields']['MaterialIDCount']
+                all_fields = result['Validation_and_Quality_Checks']['All Mandatory Fields extracted']
+                print(f"  ✓ PO: {po}, Materials: {mat_count}, Complete: {all_fields}")
+            else:
+                self._record_error(stats, error_log, f"{json_file.name}: No data extracted")
+                print(f"  ✗ Failed to extract data")
+            
+            stats['total'] += 1
+            
+        except Exception as e:
+            self._record_error(stats, error_log, f"{json_file.name}: {str(e)}")
+            print(f"  ✗ Error: {e}")
         
-        return stats
+        return written
+    
+    @staticmethod
+    def _write_json(output_path: Path, result: Dict[str, Any]):
+        # Serialize in one go so each file is a single write
+        if orjson is not None:
+            data = orjson.dumps(result, option=orjson.OPT_INDENT_2)
+        else:
+            data = json.dumps(result, indent=2, ensure_ascii=False).encode('utf-8')
+        output_path.write_bytes(data)
     
     def _extract_number_from_filename(self, filename: str) -> int:
         """Extract number from filename for sorting"""
-        match = re.search(r'_(\d+)\.pdf', filename)
+        match = self.FILE_NUMBER_RE.search(filename)
         if match:
             return int(match.group(1))
         return 0
@@ -321,14 +544,16 @@ class InvoiceFieldExtractor:
         print(f"Total files processed: {stats['total']}")
         print(f"Successful extractions: {stats['successful']}")
         print(f"Failed extractions: {stats['failed']}")
-        print(f"Success rate: {stats['successful']/stats['total']*100:.1f}%")
+        print(f"Skipped (unchanged): {stats['skipped']}")
+        if stats['total']:
+            print(f"Success rate: {stats['successful']/stats['total']*100:.1f}%")
         
-        if stats['errors']:
-            print(f"\nErrors encountered: {len(stats['errors'])}")
-            for error in stats['errors'][:10]:  # Show first 10 errors
+        if stats['error_count']:
+            print(f"\nErrors encountered: {stats['error_count']}")
+            for error in stats['errors'][:self.ERRORS_SHOWN]:  # Show first 10 errors
                 print(f"  - {error}")
-            if len(stats['errors']) > 10:
-                print(f"  ... and {len(stats['errors']) - 10} more")
+            if stats['error_count'] > self.ERRORS_SHOWN:
+                print(f"  ... and {stats['error_count'] - self.ERRORS_SHOWN} more")
         
         print("="*70)
         
@@ -339,9 +564,12 @@ class InvoiceFieldExtractor:
             f.write(f"Total: {stats['total']}\n")
             f.write(f"Successful: {stats['successful']}\n")
             f.write(f"Failed: {stats['failed']}\n")
+            f.write(f"Skipped: {stats['skipped']}\n")
             f.write(f"\nErrors:\n")
-            for error in stats['errors']:
-                f.write(f"  {error}\n")
+            if self.error_log_path.exists():
+                with open(self.error_log_path, encoding='utf-8') as error_log:
+                    for error in error_log:
+                        f.write(f"  {error}")
 
 
 def main():
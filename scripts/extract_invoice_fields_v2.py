@@ -22,6 +22,16 @@ class ImprovedInvoiceFieldExtractor:
         'lis', 'list', 'ODER', 'order', 'Issued', 'issued', 'Bill', 'bill',
         'Date', 'date', 'Total', 'total', 'Page', 'page', 'Item', 'item'
     }
+
+    # Non-product numbers and column labels that look like material IDs
+    MATERIAL_ID_EXCLUDE_RE = re.compile(
+        r'10\d{8}'  # Order numbers starting with 10
+        r'|20\d{8}'  # Customer numbers starting with 20
+        r'|975'  # Short numbers
+        r'|GTIN|DESCRIPTION|PRODUCT|ITEM|ORDER|UNIT|COMMENTS|CODE'  # Labels
+        r'|[0-9]{4}',  # Too short (4 digits)
+        re.IGNORECASE
+    )
     
     def __init__(self, input_dir: str, output_dir: str):
         self.input_dir = Path(input_dir)
@@ -243,24 +253,10 @@ class ImprovedInvoiceFieldExtractor:
         # Combine and filter
         all_ids = gtin_matches + item_matches + line_matches
         
-        # Exclusion list: common non-product numbers
-        exclude_patterns = [
-            r'^10\d{8}$',  # Order numbers starting with 10
-            r'^20\d{8}$',  # Customer numbers starting with 20
-            r'^975$',  # Short numbers
-            r'^GTIN$', r'^DESCRIPTION$', r'^PRODUCT$', r'^ITEM$',  # Labels
-            r'^ORDER$', r'^UNIT$', r'^COMMENTS$', r'^CODE$',
-            r'^[0-9]{4}$',  # Too short (4 digits)
-        ]
-        
         seen = set()
         for id_val in all_ids:
-            # Skip if matches exclusion patterns
-            if any(re.match(pat, id_val, re.IGNORECASE) for pat in exclude_patterns):
-                continue
-            
-            # Skip if it's a known non-product term
-            if id_val.upper() in ['DESCRIPTION', 'PRODUCT', 'ITEM', 'CODE', 'GTIN', 'UNIT', 'ORDER']:
+            # Skip common non-product numbers and known non-product terms
+            if self.MATERIAL_ID_EXCLUDE_RE.fullmatch(id_val):
                 continue
             
             # Must be at least 5 characters for GTIN or SKU
@@ -5,11 +5,14 @@ Fixed patterns to match actual invoice formats
 Handles ETA dates, better material ID extraction, and improved address parsing
 """
 
+import contextlib
+import io
 import json
 import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
 class EnhancedInvoiceFieldExtractor:
@@ -23,6 +26,23 @@ class EnhancedInvoiceFieldExtractor:
         'Date', 'date', 'Total', 'total', 'Page', 'page', 'Item', 'item',
         'Crossroads', 'Commerce', 'Blvd', 'Boulevard', 'Street', 'Avenue'
     }
+    PO_BLACKLIST_LOWER = frozenset(word.lower() for word in PO_BLACKLIST)
+    
+    # Address lines to skip completely
+    ADDRESS_SKIP_RE = re.compile(
+        r'v\s*endor:\s*\d+'  # "v endor: 087"
+        r'|VENDOR:\s*\d+'
+        r'|PHONE:|FAX:|Phone:|EMAIL:|ACCT#'
+        r'|WDE\d+'  # Warehouse codes
+        r'|\d{5}\s+(?:Crossroads|Commerce)',  # Address numbers (10889 Crossroads)
+        re.IGNORECASE
+    )
+    
+    # Labels to remove from start of address lines
+    ADDRESS_LABELS = (
+        'SHIP TO', 'SOLD TO', 'BILL TO', 'INVOICE TO',
+        'DELIVER TO', 'ORDER TO', 'Ship To', 'Invoice To',
+    )
     
     def __init__(self, input_dir: str, output_dir: str):
         self.input_dir = Path(input_dir)
@@ -50,7 +70,7 @@ class EnhancedInvoiceFieldExtractor:
         po = po.strip()
         
         # Check blacklist
-        if po in self.PO_BLACKLIST or po.lower() in {x.lower() for x in self.PO_BLACKLIST}:
+        if po.lower() in self.PO_BLACKLIST_LOWER:
             return None
         
         # Must be at least 3 characters
@@ -158,25 +178,6 @@ class EnhancedInvoiceFieldExtractor:
         lines = address.split('\n')
         cleaned_lines = []
         
-        # Labels and patterns to skip completely
-        skip_patterns = [
-            r'^v\s*endor:\s*\d+',  # "v endor: 087"
-            r'^VENDOR:\s*\d+',
-            r'^PHONE:',
-            r'^FAX:',
-            r'^Phone:',
-            r'^EMAIL:',
-            r'^ACCT#',
-            r'^WDE\d+',  # Warehouse codes
-            r'^\d{5}\s+(?:Crossroads|Commerce)',  # Address numbers (10889 Crossroads)
-        ]
-        
-        # Labels to remove from start of lines
-        labels_to_remove = [
-            'SHIP TO', 'SOLD TO', 'BILL TO', 'INVOICE TO', 
-            'DELIVER TO', 'ORDER TO', 'Ship To', 'Invoice To',
-        ]
-        
         for line in lines:
             line = line.strip()
             
@@ -185,11 +186,11 @@ class EnhancedInvoiceFieldExtractor:
                 continue
             
             # Skip lines matching skip patterns
-            if any(re.match(pattern, line, re.IGNORECASE) for pattern in skip_patterns):
+            if self.ADDRESS_SKIP_RE.match(line):
                 continue
             
             # Remove labels from start
-            for label in labels_to_remove:
+            for label in self.ADDRESS_LABELS:
                 if line.startswith(label):
                     line = line.replace(label, '', 1).strip(':').strip()
             
@@ -197,11 +198,13 @@ class EnhancedInvoiceFieldExtractor:
             if not line or len(line) < 3:
                 continue
                 
-            # Keep lines with substantive content
+            # Keep lines with substantive content; the first 4 make up the
+            # address (company, street, city/state/zip, country if present)
             cleaned_lines.append(line)
+            if len(cleaned_lines) == 4:
+                break
         
-        # Return first 4 lines as address (company, street, city/state/zip, country if present)
-        return ', '.join(cleaned_lines[:4])
+        return ', '.join(cleaned_lines)
     
     def extract_shipping_address(self, text: str) -> Optional[str]:
         """Extract Shipping Address - IMPROVED patterns"""
@@ -443,8 +446,32 @@ class EnhancedInvoiceFieldExtractor:
         
         return result
     
-    def process_all_files(self) -> Dict[str, Any]:
-        """Process all OCR files"""
+    def process_file(self, json_file: Path) -> Tuple[Optional[Dict[str, Any]], Optional[str], str]:
+        """
+        Extract fields from one OCR file and save them; returns (result, error, output)
+        output is what the extraction printed, handed back so it is shown after the file's progress line
+        """
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            try:
+                result = self.extract_all_fields(json_file)
+                
+                if result:
+                    output_filename = f"{json_file.stem}_extracted.json"
+                    output_path = self.output_dir / output_filename
+                    
+                    with open(output_path, 'w', encoding='utf-8') as f:
+                        json.dump(result, f, indent=2, ensure_ascii=False)
+                
+                error = None
+                
+            except Exception as e:
+                result, error = None, str(e)
+        
+        return result, error, output.getvalue()
+    
+    def process_all_files(self, max_workers: int = 1) -> Dict[str, Any]:
+        """Process all OCR files, in max_workers worker processes when more than one is requested"""
         
         json_files = sorted(
             self.input_dir.glob('*.json'),
@@ -461,19 +488,26 @@ class EnhancedInvoiceFieldExtractor:
             'errors': []
         }
         
-        for idx, json_file in enumerate(json_files, 1):
-            print(f"Processing [{idx}/{len(json_files)}]: {json_file.name}", end=' ')
-            
-            try:
-                result = self.extract_all_fields(json_file)
+        # With max_workers > 1 the files, which are independent, are extracted in
+        # worker processes; map() keeps results in input order for the progress output.
+        executor = ProcessPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        if executor is not None:
+            outcomes = executor.map(self.process_file, json_files, chunksize=8)
+        else:
+            outcomes = map(self.process_file, json_files)
+        
+        try:
+            for idx, (json_file, (result, error, output)) in enumerate(zip(json_files, outcomes), 1):
+                print(f"Processing [{idx}/{len(json_files)}]: {json_file.name}", end=' ')
+                print(output, end='')
+                
+                if error is not None:
+                    stats['failed'] += 1
+                    stats['errors'].append(f"{json_file.name}: {error}")
+                    print(f"✗ Error: {error}")
+                    continue
                 
                 if result:
-                    output_filename = f"{json_file.stem}_extracted.json"
-                    output_path = self.output_dir / output_filename
-                    
-                    with open(output_path, 'w', encoding='utf-8') as f:
-                        json.dump(result, f, indent=2, ensure_ascii=False)
-                    
                     stats['successful'] += 1
                     
                     # Track complete extractions
@@ -491,11 +525,9 @@ class EnhancedInvoiceFieldExtractor:
                     print("✗ Failed")
                 
                 stats['total'] += 1
-                
-            except Exception as e:
-                stats['failed'] += 1
-                stats['errors'].append(f"{json_file.name}: {str(e)}")
-                print(f"✗ Error: {e}")
+        finally:
+            if executor is not None:
+                executor.shutdown()
         
         return stats
     
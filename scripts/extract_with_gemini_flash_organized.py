@@ -4,117 +4,180 @@ Gemini 1.5 Flash Invoice Extraction with Organized Output
 Separates files by status: success, errors, needs_review
 """
 
+import asyncio
+import hashlib
 import json
 import os
 import re
+import sqlite3
+from collections import deque
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import time
 import traceback
 
+try:
+    import orjson
+except ImportError:  # Optional: faster reads of OCR files and writes of results
+    orjson = None
+
+try:
+    from zoneinfo import ZoneInfo
+    PACIFIC_TZ = ZoneInfo("America/Los_Angeles")  # Gemini daily quotas reset at Pacific midnight
+except Exception:
+    PACIFIC_TZ = timezone(timedelta(hours=-8))
+
 # Import Google Generative AI
 try:
     import google.generativeai as genai
+    from google.api_core import exceptions as google_exceptions
+    from google.api_core.retry import AsyncRetry, if_exception_type
 except ImportError:
     print("ERROR: google-generativeai not installed!")
     print("Install with: pip install google-generativeai")
     exit(1)
 
 
-class OrganizedGeminiExtractor:
-    """Extract invoice fields with organized output by status"""
+class LLMCache:
+    """SQLite cache of parsed Gemini responses, keyed by prompt version + model + input file content hash"""
     
-    def __init__(self, api_key: str, input_dir: str, output_base_dir: str):
-        self.input_dir = Path(input_dir)
-        self.output_base_dir = Path(output_base_dir)
-        self.output_base_dir.mkdir(exist_ok=True)
-        
-        # Create organized subdirectories
-        self.success_dir = self.output_base_dir / "successful"
-        self.review_dir = self.output_base_dir / "needs_review"
-        self.error_dir = self.output_base_dir / "errors"
-        
-        self.success_dir.mkdir(exist_ok=True)
-        self.review_dir.mkdir(exist_ok=True)
-        self.error_dir.mkdir(exist_ok=True)
-        
-        # Configure Gemini Flash (using latest available model)
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('models/gemini-2.5-flash')  # Latest Flash model
-        
-        # Rate limiting
-        self.request_count = 0
-        self.max_requests_per_minute = 15  # Flash: 15 RPM on free tier
-        self.last_request_time = time.time()
+    def __init__(self, db_path: Path):
+        self.conn = sqlite3.connect(str(db_path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at TEXT NOT NULL)"
+        )
+        self.conn.commit()
     
-    def rate_limit(self):
-        """Simple rate limiting"""
-        self.request_count += 1
-        current_time = time.time()
-        
-        if current_time - self.last_request_time > 60:
-            self.request_count = 0
-            self.last_request_time = current_time
-        
-        if self.request_count >= self.max_requests_per_minute:
-            wait_time = 60 - (current_time - self.last_request_time)
-            if wait_time > 0:
-                print(f"  ⏱️  Rate limit, waiting {wait_time:.1f}s...")
-                time.sleep(wait_time)
-                self.request_count = 0
-                self.last_request_time = time.time()
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
     
-    def extract_text_from_ocr(self, ocr_data: Dict) -> str:
-        """Extract all text from OCR JSON"""
+    def set(self, key: str, response: Dict):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+            (key, json.dumps(response, ensure_ascii=False), datetime.now().isoformat())
+        )
+        self.conn.commit()
+
+
+class GeminiRateLimiter:
+    """
+    Keeps Gemini calls under the requests-per-minute, tokens-per-minute and
+    requests-per-day quotas, with a safety margin on the per-minute limits.
+    The daily count is persisted so restarts on the same day keep counting.
+    """
+    
+    SAFETY_MARGIN = 0.9
+    WINDOW_SECONDS = 60
+    SAVE_EVERY = 10  # requests between writes of the daily count; flush() writes the rest
+    
+    def __init__(self, rpm: int, tpm: int, rpd: int, quota_path: Path):
+        self.rpm_limit = max(1, int(rpm * self.SAFETY_MARGIN))
+        self.tpm_limit = max(1, int(tpm * self.SAFETY_MARGIN))
+        self.rpd_limit = rpd
+        self.quota_path = quota_path
+        
+        self.request_times = deque()  # monotonic timestamps in the last minute
+        self.token_log = deque()  # (monotonic timestamp, estimated tokens) in the last minute
+        self.tokens_in_window = 0
+        self._lock = asyncio.Lock()
+        
+        self.day, self.day_count = self._load_quota()
+    
+    @staticmethod
+    def _pacific_today() -> str:
+        return datetime.now(PACIFIC_TZ).date().isoformat()
+    
+    def _load_quota(self) -> Tuple[str, int]:
+        today = self._pacific_today()
         try:
-            text_parts = []
-            if 'pages' in ocr_data:
-                for page in ocr_data['pages']:
-                    if 'text' in page:
-                        text_parts.append(page['text'])
-            return '\n'.join(text_parts)
-        except Exception as e:
-            raise Exception(f"Error extracting text: {e}")
+            with open(self.quota_path, 'r', encoding='utf-8') as f:
+                quota = json.load(f)
+            if quota.get('date') == today:
+                return today, int(quota.get('requests', 0))
+        except (OSError, ValueError):
+            pass
+        return today, 0
     
-    def normalize_date_format(self, date_str: str) -> Optional[str]:
-        """Convert any date format to YYYY/MM/DD"""
-        if not date_str or date_str == "null":
-            return None
-        
-        date_str = date_str.strip()
-        
-        # Already in YYYY/MM/DD or YYYY-MM-DD format?
-        if re.match(r'^\d{4}[/-]\d{2}[/-]\d{2}$', date_str):
-            return date_str.replace('-', '/')
-        
-        # Try to parse various formats
-        date_patterns = [
-            (r'^(\d{1,2})[/-](\d{1,2})[/-](\d{2})$', 'MM/DD/YY'),
-            (r'^(\d{1,2})[/-](\d{1,2})[/-](\d{4})$', 'MM/DD/YYYY'),
-            (r'^(\d{4})[/-](\d{1,2})[/-](\d{1,2})$', 'YYYY/MM/DD'),
-        ]
-        
-        for pattern, format_type in date_patterns:
-            match = re.match(pattern, date_str)
-            if match:
-                if format_type == 'MM/DD/YY':
-                    month, day, year = match.groups()
-                    year_full = f"20{year}" if int(year) <= 50 else f"19{year}"
-                    return f"{year_full}/{int(month):02d}/{int(day):02d}"
-                elif format_type == 'MM/DD/YYYY':
-                    month, day, year = match.groups()
-                    return f"{year}/{int(month):02d}/{int(day):02d}"
-                elif format_type == 'YYYY/MM/DD':
-                    year, month, day = match.groups()
-                    return f"{year}/{int(month):02d}/{int(day):02d}"
-        
-        return date_str
+    def _save_quota(self, day: str, count: int):
+        # Write a temp file and swap it in, so an interrupted write never leaves a truncated quota file
+        tmp_path = self.quota_path.with_name(self.quota_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'date': day, 'requests': count}, f)
+        os.replace(tmp_path, self.quota_path)
     
-    def create_extraction_prompt(self, ocr_text: str) -> str:
-        """Create extraction prompt"""
-        
-        prompt = f"""You are a precise invoice data extraction system.
+    async def flush(self):
+        """Persist the current daily count"""
+        async with self._lock:
+            await asyncio.to_thread(self._save_quota, self.day, self.day_count)
+    
+    def _seconds_until_pacific_midnight(self) -> float:
+        now = datetime.now(PACIFIC_TZ)
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=PACIFIC_TZ)
+        return max(1.0, (midnight - now).total_seconds())
+    
+    async def acquire(self, estimated_tokens: int = 0):
+        """
+        Wait until one more request of estimated_tokens fits in every quota, then record it
+        Call once per attempt sent to the API, retries included
+        """
+        async with self._lock:
+            while True:
+                today = self._pacific_today()
+                if today != self.day:
+                    self.day, self.day_count = today, 0
+                
+                if self.day_count >= self.rpd_limit:
+                    wait_time = self._seconds_until_pacific_midnight()
+                    print(f"  ⏱️  Daily quota of {self.rpd_limit} requests reached, waiting {wait_time / 3600:.1f}h...")
+                    await asyncio.sleep(wait_time)
+                    continue
+                
+                now = time.monotonic()
+                cutoff = now - self.WINDOW_SECONDS
+                while self.request_times and self.request_times[0] <= cutoff:
+                    self.request_times.popleft()
+                while self.token_log and self.token_log[0][0] <= cutoff:
+                    self.tokens_in_window -= self.token_log.popleft()[1]
+                
+                wait_time = 0.0
+                if len(self.request_times) >= self.rpm_limit:
+                    wait_time = self.request_times[0] - cutoff
+                if self.token_log and self.tokens_in_window + estimated_tokens > self.tpm_limit:
+                    wait_time = max(wait_time, self.token_log[0][0] - cutoff)
+                
+                if wait_time <= 0:
+                    break
+                print(f"  ⏱️  Rate limit, waiting {wait_time:.1f}s...")
+                await asyncio.sleep(wait_time)
+            
+            self.request_times.append(now)
+            self.token_log.append((now, estimated_tokens))
+            self.tokens_in_window += estimated_tokens
+            self.day_count += 1
+            if self.day_count % self.SAVE_EVERY == 0:
+                await asyncio.to_thread(self._save_quota, self.day, self.day_count)
+
+
+class OrganizedGeminiExtractor:
+    """Extract invoice fields with organized output by status"""
+    
+    # Date shapes handled by normalize_date_format, matched against the whole string
+    ISO_DATE_RE = re.compile(r'\d{4}[/-]\d{2}[/-]\d{2}')
+    DATE_PATTERNS = (
+        (re.compile(r'(\d{1,2})[/-](\d{1,2})[/-](\d{2})'), 'MM/DD/YY'),  # 5/07/25
+        (re.compile(r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})'), 'MM/DD/YYYY'),  # 5/07/2025
+        (re.compile(r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})'), 'YYYY/MM/DD'),  # 2025/5/7
+    )
+    
+    # Part of every response cache key; bump when EXTRACTION_INSTRUCTIONS or the prompt templates change
+    PROMPT_VERSION = 1
+    
+    # Field rules and output format, sent once as the model's system instruction so
+    # every request shares the same static prefix; prompts carry only the OCR text
+    EXTRACTION_INSTRUCTIONS = """You are a precise invoice data extraction system.
 
 CRITICAL RULES:
 1. Extract ONLY data that exists in the text
@@ -147,54 +210,176 @@ FIELDS TO EXTRACT:
 8. LineItemCount: Count of actual product rows only (not headers/footers)
 
 OUTPUT FORMAT:
-{{
-  "FileName": {{
+{
+  "FileName": {
     "value": "Company name from Ship To or null",
     "confidence": "high/medium/low",
     "source_text": "snippet from OCR"
-  }},
-  "SourceOrderID": {{
+  },
+  "SourceOrderID": {
     "value": "vendor number or null",
     "confidence": "high/medium/low",
     "source_text": "snippet"
-  }},
-  "PONumber": {{
+  },
+  "PONumber": {
     "value": "PO number or null",
     "confidence": "high/medium/low",
     "source_text": "snippet"
-  }},
-  "RDD": {{
+  },
+  "RDD": {
     "value": "date in YYYY/MM/DD or null",
     "confidence": "high/medium/low",
     "source_text": "EXACT original date as found in OCR (e.g., 05/08/2025)"
-  }},
-  "ShippingAddress": {{
+  },
+  "ShippingAddress": {
     "value": "complete address or null",
     "confidence": "high/medium/low",
     "source_text": "first line"
-  }},
-  "BillingAddress": {{
+  },
+  "BillingAddress": {
     "value": "complete address or null",
     "confidence": "high/medium/low",
     "source_text": "first line"
-  }},
-  "MaterialIDList": {{
+  },
+  "MaterialIDList": {
     "value": ["id1", "id2", ...] or [],
     "confidence": "high/medium/low",
     "source_text": "sample IDs"
-  }},
-  "LineItemCount": {{
+  },
+  "LineItemCount": {
     "value": number,
     "confidence": "high/medium/low",
     "source_text": "where counted"
-  }}
-}}
-
-OCR TEXT:
+  }
+}"""
+    
+    # Extra attempts when the answer is not valid JSON
+    JSON_RETRIES = 1
+    
+    # Errors worth retrying; anything else (bad key, 400, safety block) fails on the first call
+    RETRYABLE_ERRORS = (
+        google_exceptions.ResourceExhausted,  # 429
+        google_exceptions.ServiceUnavailable,  # 503
+        google_exceptions.InternalServerError,  # 500
+        google_exceptions.DeadlineExceeded,
+        ConnectionError,
+        asyncio.TimeoutError,
+    )
+    
+    # Jittered exponential backoff for RETRYABLE_ERRORS, applied by google-api-core to each call
+    API_RETRY_INITIAL = 1.0
+    API_RETRY_MAXIMUM = 30.0
+    API_RETRY_MULTIPLIER = 2.0
+    API_RETRY_TIMEOUT = 90.0
+    
+    def __init__(self, api_key: str, input_dir: str, output_base_dir: str, max_concurrency: int = 4,
+                 use_cache: bool = True, batch_size: int = 1, skip_existing: bool = True):
+        self.input_dir = Path(input_dir)
+        self.output_base_dir = Path(output_base_dir)
+        self.output_base_dir.mkdir(exist_ok=True)
+        
+        # Create organized subdirectories
+        self.success_dir = self.output_base_dir / "successful"
+        self.review_dir = self.output_base_dir / "needs_review"
+        self.error_dir = self.output_base_dir / "errors"
+        
+        self.success_dir.mkdir(exist_ok=True)
+        self.review_dir.mkdir(exist_ok=True)
+        self.error_dir.mkdir(exist_ok=True)
+        
+        # Configure Gemini Flash (using latest available model)
+        genai.configure(api_key=api_key)
+        self.model_name = 'models/gemini-2.5-flash'  # Latest Flash model
+        self.model = genai.GenerativeModel(self.model_name, system_instruction=self.EXTRACTION_INSTRUCTIONS)
+        self.api_retry = AsyncRetry(
+            predicate=if_exception_type(*self.RETRYABLE_ERRORS),
+            initial=self.API_RETRY_INITIAL,
+            maximum=self.API_RETRY_MAXIMUM,
+            multiplier=self.API_RETRY_MULTIPLIER,
+            timeout=self.API_RETRY_TIMEOUT,
+        )
+        
+        # Responses for unchanged input files are reused across runs
+        self.cache = LLMCache(self.output_base_dir / "gemini_cache.sqlite3") if use_cache else None
+        
+        # Concurrent requests in flight (bounded by a semaphore per run)
+        self.max_concurrency = max_concurrency
+        
+        # Invoices sent per Gemini call; keep the batch's JSON array under the 8192 output-token limit
+        self.batch_size = max(1, batch_size)
+        
+        # Files already in successful/ or needs_review/ are not sent again (errors are retried)
+        self.skip_existing = skip_existing
+        
+        # Rate limiting (Flash free tier: 15 RPM, 1M TPM, 1500 RPD)
+        self.rate_limiter = GeminiRateLimiter(
+            rpm=15, tpm=1_000_000, rpd=1500,
+            quota_path=self.output_base_dir / ".gemini_quota.json"
+        )
+    
+    def extract_text_from_ocr(self, ocr_data: Dict) -> str:
+        """Extract all text from OCR JSON"""
+        try:
+            text_parts = []
+            if 'pages' in ocr_data:
+                for page in ocr_data['pages']:
+                    if 'text' in page:
+                        text_parts.append(page['text'])
+            return '\n'.join(text_parts)
+        except Exception as e:
+            raise Exception(f"Error extracting text: {e}")
+    
+    def normalize_date_format(self, date_str: str) -> Optional[str]:
+        """Convert any date format to YYYY/MM/DD"""
+        if not date_str or date_str == "null":
+            return None
+        
+        date_str = date_str.strip()
+        
+        # Already in YYYY/MM/DD or YYYY-MM-DD format?
+        if self.ISO_DATE_RE.fullmatch(date_str):
+            return date_str.replace('-', '/')
+        
+        # Try to parse various formats
+        for pattern, format_type in self.DATE_PATTERNS:
+            match = pattern.fullmatch(date_str)
+            if match:
+                if format_type == 'MM/DD/YY':
+                    month, day, year = match.groups()
+                    year_full = f"20{year}" if int(year) <= 50 else f"19{year}"
+                    return f"{year_full}/{int(month):02d}/{int(day):02d}"
+                elif format_type == 'MM/DD/YYYY':
+                    month, day, year = match.groups()
+                    return f"{year}/{int(month):02d}/{int(day):02d}"
+                elif format_type == 'YYYY/MM/DD':
+                    year, month, day = match.groups()
+                    return f"{year}/{int(month):02d}/{int(day):02d}"
+        
+        return date_str
+    
+    def create_extraction_prompt(self, ocr_text: str) -> str:
+        """Create extraction prompt"""
+        
+        prompt = f"""OCR TEXT:
 {ocr_text[:65000]}
 
 Extract now. Return ONLY JSON."""
+        
+        return prompt
+    
+    def create_batch_extraction_prompt(self, ocr_texts: List[str]) -> str:
+        """Create one prompt covering several documents; the answer is a JSON array in document order"""
+        
+        documents = "\n\n".join(
+            f"DOCUMENT {i} OCR TEXT:\n{ocr_text[:65000]}" for i, ocr_text in enumerate(ocr_texts, 1)
+        )
+        prompt = f"""You are given {len(ocr_texts)} separate documents. Apply the extraction rules to each one independently.
+Return a JSON array with exactly {len(ocr_texts)} elements, where element i is the OUTPUT FORMAT object for DOCUMENT i.
+
+{documents}
 
+Extract now. Return ONLY a JSON array."""
+        
         return prompt
     
     def validate_extraction(self, extracted: Dict, ocr_text: str) -> Tuple[Dict, List[str]]:
@@ -319,25 +504,53 @@ Extract now. Return ONLY JSON."""
         
         return validation_report, errors
     
-    def extract_with_gemini(self, ocr_text: str) -> Tuple[Optional[Dict], Optional[List[str]]]:
+    async def _generate_json(self, prompt: str) -> Any:
+        """
+        Call Gemini and parse the JSON in its answer
+        Transient API errors are retried by api_core (self.api_retry); malformed JSON is re-asked up to JSON_RETRIES times
+        """
+        for attempt in range(self.JSON_RETRIES + 1):
+            response = await self.api_retry(self._call_gemini)(prompt)
+            response_text = response.text.strip()
+            
+            # Extract JSON from the first fenced block, if any
+            _, fence, rest = response_text.partition('```json')
+            if not fence:
+                _, fence, rest = response_text.partition('```')
+            if fence:
+                response_text = rest.partition('```')[0].strip()
+            
+            try:
+                return json.loads(response_text)
+            except json.JSONDecodeError:
+                if attempt == self.JSON_RETRIES:
+                    raise
+    
+    async def _call_gemini(self, prompt: str):
+        """Send one request; retried attempts come back through here, so each one is rate limited"""
+        await self.rate_limiter.acquire(estimated_tokens=len(prompt) // 4)
+        return await self.model.generate_content_async(prompt)
+    
+    def _cache_key(self, content_hash: str) -> str:
+        return f"{self.PROMPT_VERSION}:{self.model_name}:{content_hash}"
+    
+    async def extract_with_gemini(self, ocr_text: str, content_hash: Optional[str] = None) -> Tuple[Optional[Dict], Optional[List[str]]]:
         """
         Extract with Gemini
         Returns: (extracted_data, errors) or (None, error_list)
+        content_hash (sha256 of the OCR file) enables the response cache
         """
         try:
-            self.rate_limit()
+            use_cache = self.cache is not None and content_hash is not None
+            if use_cache:
+                cached = self.cache.get(self._cache_key(content_hash))
+                if cached is not None:
+                    return cached, None
             
             prompt = self.create_extraction_prompt(ocr_text)
-            response = self.model.generate_content(prompt)
-            response_text = response.text.strip()
-            
-            # Extract JSON
-            if '```json' in response_text:
-                response_text = response_text.split('```json')[1].split('```')[0].strip()
-            elif '```' in response_text:
-                response_text = response_text.split('```')[1].split('```')[0].strip()
-            
-            extracted = json.loads(response_text)
+            extracted = await self._generate_json(prompt)
+            if use_cache:
+                self.cache.set(self._cache_key(content_hash), extracted)
             return extracted, None
             
         except json.JSONDecodeError as e:
@@ -345,6 +558,53 @@ Extract now. Return ONLY JSON."""
         except Exception as e:
             return None, [f"Gemini API error: {e}"]
     
+    async def extract_batch_with_gemini(self, ocr_texts: List[str],
+                                        content_hashes: Optional[List[str]] = None) -> List[Tuple[Optional[Dict], Optional[List[str]]]]:
+        """
+        Extract several documents with one Gemini call
+        Returns one (extracted_data, errors) pair per document, in order
+        Documents already in the response cache are answered from it and left out of the prompt
+        """
+        use_cache = self.cache is not None and content_hashes is not None
+        results: List[Tuple[Optional[Dict], Optional[List[str]]]] = [(None, None)] * len(ocr_texts)
+        misses = []
+        for i in range(len(ocr_texts)):
+            cached = self.cache.get(self._cache_key(content_hashes[i])) if use_cache else None
+            if cached is not None:
+                results[i] = (cached, None)
+            else:
+                misses.append(i)
+        
+        if not misses:
+            return results
+        
+        try:
+            prompt = self.create_batch_extraction_prompt([ocr_texts[i] for i in misses])
+            extracted_list = await self._generate_json(prompt)
+            if not isinstance(extracted_list, list) or len(extracted_list) != len(misses):
+                count = len(extracted_list) if isinstance(extracted_list, list) else 'non-array'
+                error = f"Batch response has {count} elements, expected {len(misses)}"
+                for i in misses:
+                    results[i] = (None, [error])
+                return results
+            
+            for i, extracted in zip(misses, extracted_list):
+                if isinstance(extracted, dict):
+                    results[i] = (extracted, None)
+                    if use_cache:
+                        self.cache.set(self._cache_key(content_hashes[i]), extracted)
+                else:
+                    results[i] = (None, ["Batch element is not a JSON object"])
+            
+        except json.JSONDecodeError as e:
+            for i in misses:
+                results[i] = (None, [f"JSON parse error: {e}"])
+        except Exception as e:
+            for i in misses:
+                results[i] = (None, [f"Gemini API error: {e}"])
+        
+        return results
+    
     def build_final_output(self, validation_report: Dict, errors: List[str]) -> Dict:
         """Build final output structure"""
         
@@ -391,48 +651,87 @@ Extract now. Return ONLY JSON."""
         
         return result
     
-    def process_single_file(self, ocr_file_path: Path) -> Tuple[Optional[Dict], str, List[str]]:
+    def load_ocr_file(self, ocr_file_path: Path) -> Tuple[str, str]:
+        """Load an OCR JSON file; returns (text, sha256 of the file content)"""
+        raw = ocr_file_path.read_bytes()
+        ocr_data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        return self.extract_text_from_ocr(ocr_data), hashlib.sha256(raw).hexdigest()
+    
+    def finalize_extraction(self, extracted: Dict, ocr_text: str) -> Tuple[Optional[Dict], str, List[str]]:
+        """Validate an extraction and build the output; returns (result, status, errors)"""
+        errors = []
+        
+        # Validate
+        validation_report, validation_errors = self.validate_extraction(extracted, ocr_text)
+        errors.extend(validation_errors)
+        
+        # Build output
+        result = self.build_final_output(validation_report, errors)
+        
+        # Use the needs_human_review flag which respects the 90% threshold
+        if result['Confidence_and_Validation']['needs_human_review']:
+            status = "needs_review"
+        else:
+            status = "success"
+        
+        return result, status, errors
+    
+    async def process_single_file(self, ocr_file_path: Path) -> Tuple[Optional[Dict], str, List[str]]:
         """
         Process a single file
         Returns: (result, status, errors)
         status = "success" | "needs_review" | "error"
         """
-        errors = []
-        
         try:
-            # Load OCR
-            with open(ocr_file_path, 'r', encoding='utf-8') as f:
-                ocr_data = json.load(f)
-            
-            # Extract text
-            ocr_text = self.extract_text_from_ocr(ocr_data)
+            # Load OCR and extract text
+            ocr_text, content_hash = await asyncio.to_thread(self.load_ocr_file, ocr_file_path)
             if not ocr_text:
                 return None, "error", ["No text in OCR"]
             
             # Extract with Gemini
-            extracted, extract_errors = self.extract_with_gemini(ocr_text)
+            extracted, extract_errors = await self.extract_with_gemini(ocr_text, content_hash)
             if extract_errors:
                 return None, "error", extract_errors
             
-            # Validate
-            validation_report, validation_errors = self.validate_extraction(extracted, ocr_text)
-            errors.extend(validation_errors)
-            
-            # Build output
-            result = self.build_final_output(validation_report, errors)
-            
-            # Use the needs_human_review flag which respects the 90% threshold
-            if result['Confidence_and_Validation']['needs_human_review']:
-                status = "needs_review"
-            else:
-                status = "success"
-            
-            return result, status, errors
+            return self.finalize_extraction(extracted, ocr_text)
             
         except Exception as e:
             error_msg = f"Exception: {str(e)}"
             return None, "error", [error_msg]
     
+    async def process_batch(self, ocr_file_paths: List[Path]) -> List[Tuple[Optional[Dict], str, List[str]]]:
+        """
+        Process several files with a single Gemini call
+        Returns one (result, status, errors) per file, in order
+        """
+        outcomes: List[Optional[Tuple[Optional[Dict], str, List[str]]]] = [None] * len(ocr_file_paths)
+        pending = []  # (index, ocr_text, content_hash) for files that have text to extract
+        
+        for i, ocr_file_path in enumerate(ocr_file_paths):
+            try:
+                ocr_text, content_hash = await asyncio.to_thread(self.load_ocr_file, ocr_file_path)
+                if ocr_text:
+                    pending.append((i, ocr_text, content_hash))
+                else:
+                    outcomes[i] = (None, "error", ["No text in OCR"])
+            except Exception as e:
+                outcomes[i] = (None, "error", [f"Exception: {str(e)}"])
+        
+        if pending:
+            extractions = await self.extract_batch_with_gemini(
+                [ocr_text for _, ocr_text, _ in pending], [content_hash for _, _, content_hash in pending]
+            )
+            for (i, ocr_text, _), (extracted, extract_errors) in zip(pending, extractions):
+                if extract_errors:
+                    outcomes[i] = (None, "error", extract_errors)
+                    continue
+                try:
+                    outcomes[i] = self.finalize_extraction(extracted, ocr_text)
+                except Exception as e:
+                    outcomes[i] = (None, "error", [f"Exception: {str(e)}"])
+        
+        return outcomes
+    
     def process_all_files(self) -> Dict[str, Any]:
         """Process all OCR files"""
         
@@ -441,12 +740,19 @@ Extract now. Return ONLY JSON."""
             key=lambda x: self._extract_number_from_filename(x.name)
         )
         
-        print(f"Found {len(json_files)} JSON files to process")
+        print(f"Found {len(json_files)} JSON files")
+        if self.skip_existing:
+            done = self._existing_outputs()
+            found = len(json_files)
+            json_files = [f for f in json_files if f"{f.stem}_extracted.json" not in done]
+            print(f"Skipping {found - len(json_files)} already extracted; {len(json_files)} to process")
         print(f"Using: Gemini 1.5 Flash")
         print(f"Output organized by status:")
         print(f"  ✅ Success: {self.success_dir}")
         print(f"  ⚠️  Review: {self.review_dir}")
         print(f"  ❌ Errors: {self.error_dir}")
+        print(f"Response cache: {'enabled' if self.cache else 'disabled'}")
+        print(f"Invoices per request: {self.batch_size}")
         print()
         
         stats = {
@@ -457,57 +763,96 @@ Extract now. Return ONLY JSON."""
             'error_details': []
         }
         
-        for idx, json_file in enumerate(json_files, 1):
-            print(f"[{idx}/{len(json_files)}] {json_file.name[:50]}", end=' ')
-            
-            try:
-                result, status, errors = self.process_single_file(json_file)
-                
-                output_filename = f"{json_file.stem}_extracted.json"
-                
-                if status == "success":
-                    output_path = self.success_dir / output_filename
-                    stats['successful'] += 1
-                    icon = "✅"
-                elif status == "needs_review":
-                    output_path = self.review_dir / output_filename
-                    stats['needs_review'] += 1
-                    icon = "⚠️ "
-                else:  # error
-                    output_path = self.error_dir / output_filename
-                    stats['errors'] += 1
-                    stats['error_details'].append(f"{json_file.name}: {', '.join(errors)}")
-                    icon = "❌"
-                    
-                    # For errors, save error info
-                    if result is None:
-                        result = {
-                            "error": True,
-                            "errors": errors,
-                            "filename": json_file.name
-                        }
-                
-                # Save result
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    json.dump(result, f, indent=2, ensure_ascii=False)
-                
-                # Print status
-                if result and "Invoice_Header_Fields" in result:
-                    po = result['Invoice_Header_Fields'].get('PONumber', 'None')
-                    conf = result['Confidence_and_Validation'].get('overall_confidence', 0)
-                    print(f"{icon} PO: {po}, Conf: {conf:.2f}")
-                else:
-                    print(f"{icon} Error: {errors[0] if errors else 'Unknown'}")
-                
-                stats['total'] += 1
-                
-            except Exception as e:
-                stats['errors'] += 1
-                stats['error_details'].append(f"{json_file.name}: {str(e)}")
-                print(f"❌ Exception: {str(e)[:50]}")
+        asyncio.run(self._process_files(json_files, stats))
         
         return stats
     
+    async def _process_files(self, json_files: List[Path], stats: Dict[str, Any]):
+        """Run up to max_concurrency Gemini calls at once, each covering batch_size files; the rate limiter still applies"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        completed = 0
+        
+        async def process(batch: List[Path]):
+            nonlocal completed
+            async with semaphore:
+                try:
+                    if len(batch) == 1:
+                        outcomes = [await self.process_single_file(batch[0])]
+                    else:
+                        outcomes = await self.process_batch(batch)
+                    for json_file, (result, status, errors) in zip(batch, outcomes):
+                        completed += 1
+                        await self._save_result(json_file, result, status, errors, stats, completed, len(json_files))
+                except Exception as e:
+                    for json_file in batch:
+                        completed += 1
+                        stats['errors'] += 1
+                        stats['error_details'].append(f"{json_file.name}: {str(e)}")
+                        print(f"[{completed}/{len(json_files)}] {json_file.name[:50]} ❌ Exception: {str(e)[:50]}")
+        
+        batches = [json_files[i:i + self.batch_size] for i in range(0, len(json_files), self.batch_size)]
+        try:
+            await asyncio.gather(*(process(batch) for batch in batches))
+        finally:
+            await self.rate_limiter.flush()
+    
+    @staticmethod
+    def _write_json(output_path: Path, result: Dict):
+        if orjson is not None:
+            output_path.write_bytes(orjson.dumps(result, option=orjson.OPT_INDENT_2))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2, ensure_ascii=False)
+    
+    async def _save_result(self, json_file: Path, result: Optional[Dict], status: str, errors: List[str],
+                           stats: Dict[str, Any], idx: int, total: int):
+        """Save one file's result into its status folder and print its progress line"""
+        output_filename = f"{json_file.stem}_extracted.json"
+        
+        if status == "success":
+            output_path = self.success_dir / output_filename
+            stats['successful'] += 1
+            icon = "✅"
+        elif status == "needs_review":
+            output_path = self.review_dir / output_filename
+            stats['needs_review'] += 1
+            icon = "⚠️ "
+        else:  # error
+            output_path = self.error_dir / output_filename
+            stats['errors'] += 1
+            stats['error_details'].append(f"{json_file.name}: {', '.join(errors)}")
+            icon = "❌"
+            
+            # For errors, save error info
+            if result is None:
+                result = {
+                    "error": True,
+                    "errors": errors,
+                    "filename": json_file.name
+                }
+        
+        # Save result off the event loop so in-flight Gemini calls keep progressing
+        await asyncio.to_thread(self._write_json, output_path, result)
+        
+        # Print status
+        prefix = f"[{idx}/{total}] {json_file.name[:50]}"
+        if result and "Invoice_Header_Fields" in result:
+            po = result['Invoice_Header_Fields'].get('PONumber', 'None')
+            conf = result['Confidence_and_Validation'].get('overall_confidence', 0)
+            print(f"{prefix} {icon} PO: {po}, Conf: {conf:.2f}")
+        else:
+            print(f"{prefix} {icon} Error: {errors[0] if errors else 'Unknown'}")
+        
+        stats['total'] += 1
+    
+    def _existing_outputs(self) -> set:
+        """Output filenames already in the successful and needs_review folders (one scandir each)"""
+        existing = set()
+        for directory in (self.success_dir, self.review_dir):
+            with os.scandir(directory) as entries:
+                existing.update(entry.name for entry in entries)
+        return existing
+    
     def _extract_number_from_filename(self, filename: str) -> int:
         """Extract number from filename for sorting"""
         match = re.search(r'_(\d+)\.pdf', filename)
@@ -523,8 +868,9 @@ Extract now. Return ONLY JSON."""
         print(f"✅ Successful (high confidence): {stats['successful']}")
         print(f"⚠️  Needs Review (low confidence): {stats['needs_review']}")
         print(f"❌ Errors (failed extraction): {stats['errors']}")
-        print(f"\nSuccess rate: {(stats['successful'] + stats['needs_review'])/stats['total']*100:.1f}%")
-        print(f"High confidence rate: {stats['successful']/stats['total']*100:.1f}%")
+        if stats['total']:
+            print(f"\nSuccess rate: {(stats['successful'] + stats['needs_review'])/stats['total']*100:.1f}%")
+            print(f"High confidence rate: {stats['successful']/stats['total']*100:.1f}%")
         
         if stats['error_details']:
             print(f"\n❌ Error Details ({len(stats['error_details'])} files):")
@@ -581,7 +927,14 @@ def main():
     print("  ❌ Extraction errors → errors/")
     print()
     
-    extractor = OrganizedGeminiExtractor(api_key, INPUT_DIR, OUTPUT_DIR)
+    MAX_CONCURRENCY = 4  # Gemini requests in flight at once
+    USE_CACHE = not os.getenv('GEMINI_NO_CACHE')  # Set GEMINI_NO_CACHE=1 to force fresh responses
+    BATCH_SIZE = 1  # Invoices per Gemini call; try 4 to amortize per-request overhead under the RPM cap
+    
+    extractor = OrganizedGeminiExtractor(
+        api_key, INPUT_DIR, OUTPUT_DIR, max_concurrency=MAX_CONCURRENCY, use_cache=USE_CACHE,
+        batch_size=BATCH_SIZE
+    )
     stats = extractor.process_all_files()
     extractor.generate_summary_report(stats)
     
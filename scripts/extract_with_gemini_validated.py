@@ -28,6 +28,14 @@ except ImportError:
 class ValidatedGeminiExtractor:
     """Extract invoice fields with multi-layer validation"""
     
+    # Date shapes handled by normalize_date_format, matched against the whole string
+    ISO_DATE_RE = re.compile(r'\d{4}[/-]\d{2}[/-]\d{2}')
+    DATE_PATTERNS = (
+        (re.compile(r'(\d{1,2})[/-](\d{1,2})[/-](\d{2})'), 'MM/DD/YY'),  # 5/07/25
+        (re.compile(r'(\d{1,2})[/-](\d{1,2})[/-](\d{4})'), 'MM/DD/YYYY'),  # 5/07/2025
+        (re.compile(r'(\d{4})[/-](\d{1,2})[/-](\d{1,2})'), 'YYYY/MM/DD'),  # 2025/5/7
+    )
+    
     def __init__(self, api_key: str, input_dir: str, output_dir: str):
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
@@ -88,18 +96,12 @@ class ValidatedGeminiExtractor:
         date_str = date_str.strip()
         
         # Already in YYYY/MM/DD or YYYY-MM-DD format?
-        if re.match(r'^\d{4}[/-]\d{2}[/-]\d{2}$', date_str):
+        if self.ISO_DATE_RE.fullmatch(date_str):
             return date_str.replace('-', '/')
         
         # Try to parse various formats
-        date_patterns = [
-            (r'^(\d{1,2})[/-](\d{1,2})[/-](\d{2})$', 'MM/DD/YY'),  # 5/07/25
-            (r'^(\d{1,2})[/-](\d{1,2})[/-](\d{4})$', 'MM/DD/YYYY'),  # 5/07/2025
-            (r'^(\d{4})[/-](\d{1,2})[/-](\d{1,2})$', 'YYYY/MM/DD'),  # 2025/5/7
-        ]
-        
-        for pattern, format_type in date_patterns:
-            match = re.match(pattern, date_str)
+        for pattern, format_type in self.DATE_PATTERNS:
+            match = pattern.fullmatch(date_str)
             if match:
                 if format_type == 'MM/DD/YY':
                     month, day, year = match.groups()
@@ -10,8 +10,12 @@ def find_missing_pdfs():
     # Get all PDFs from PickSample200
     pdf_dir = "backend/PickSample200"
     pdf_files = []
-    for ext in ['*.pdf', '*.PDF']:
-        pdf_files.extend(Path(pdf_dir).glob(ext))
+    if os.path.isdir(pdf_dir):
+        with os.scandir(pdf_dir) as entries:
+            pdf_files = [
+                Path(entry.path) for entry in entries
+                if entry.name.endswith((".pdf", ".PDF")) and entry.is_file()
+            ]
     
     pdf_basenames = set()
     pdf_full_paths = {}
@@ -2,10 +2,13 @@
 Script to process all PDF files in PickSample200 directory using Surya OCR.
 Saves results to results_ocr folder.
 """
-import json
 import logging
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
+from typing import Tuple
 from datetime import datetime
 import re
 
@@ -22,8 +25,83 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def process_all_pdfs():
-    """Process all PDF files in PickSample200 directory."""
+# Outputs are named "<YYYYmmddTHHMMSS>_<safe pdf name>.json"
+_OUTPUT_NAME_RE = re.compile(r"^\d{8}T\d{6}_(.+)$")
+_SAFE_NAME_RE = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def _safe_name(pdf_name: str) -> str:
+    return _SAFE_NAME_RE.sub("_", pdf_name)
+
+
+def _already_processed(output_dir: Path) -> set:
+    """Safe output names ("<safe pdf name>.json") already present in output_dir, from one directory scan."""
+    done = set()
+    with os.scandir(output_dir) as entries:
+        for entry in entries:
+            match = _OUTPUT_NAME_RE.match(entry.name)
+            if match:
+                done.add(match.group(1))
+    return done
+
+
+# OCR service for the current worker process, created on first use so the
+# Surya models are loaded once per process rather than once per PDF
+_ocr_service = None
+
+
+def _get_ocr_service() -> SuryaOCRService:
+    global _ocr_service
+    if _ocr_service is None:
+        _ocr_service = SuryaOCRService(default_languages=["en"])
+    return _ocr_service
+
+
+def _init_worker(num_threads: int):
+    """Limit torch's intra-op threads so the worker processes share the cores instead of oversubscribing them."""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(num_threads)
+
+
+def process_one(pdf_path: Path, output_dir: Path) -> Tuple[str, str]:
+    """
+    OCR a single PDF and save the result into output_dir.
+    Returns (status, detail): status is "success" or "failed";
+    detail is the output filename or the error message.
+    """
+    try:
+        # Create safe filename for output
+        safe_name = _safe_name(pdf_path.name)
+        timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+        output_filename = f"{timestamp}_{safe_name}.json"
+        output_path = output_dir / output_filename
+        
+        # Run OCR extraction
+        result = _get_ocr_service().extract_from_pdf(
+            pdf_path=pdf_path,
+            languages=["en"],
+            include_raw=False  # Set to True if you want raw Surya output
+        )
+        
+        # Save result as JSON
+        output_path.write_text(
+            result.model_dump_json(by_alias=True, indent=2), encoding="utf-8"
+        )
+        return "success", output_filename
+        
+    except Exception as e:
+        return "failed", str(e)
+
+
+def process_all_pdfs(max_workers: int = 1):
+    """
+    Process all PDF files in PickSample200 directory using Surya OCR.
+    With max_workers > 1 the PDFs are spread over that many worker processes,
+    each loading its own copy of the OCR models (on the GPU too, if one is used).
+    """
     
     # Setup paths
     base_dir = Path(__file__).parent
@@ -38,10 +116,13 @@ def process_all_pdfs():
         logger.error(f"PDF directory not found: {pdf_dir}")
         return
     
-    # Find all PDF files (case-insensitive)
-    pdf_files = sorted(
-        list(pdf_dir.glob("*.pdf")) + list(pdf_dir.glob("*.PDF"))
-    )
+    # Find all PDF files (.pdf / .PDF) in a single directory scan; each entry is seen
+    # once, so case-insensitive filesystems no longer list a file twice
+    with os.scandir(pdf_dir) as entries:
+        pdf_files = sorted(
+            Path(entry.path) for entry in entries
+            if entry.name.endswith((".pdf", ".PDF")) and entry.is_file()
+        )
     
     total_files = len(pdf_files)
     
@@ -52,55 +133,54 @@ def process_all_pdfs():
     logger.info(f"Found {total_files} PDF files to process")
     logger.info(f"Output directory: {output_dir}")
     
-    # Initialize OCR service
-    logger.info("Initializing Surya OCR service...")
-    try:
-        ocr_service = SuryaOCRService(default_languages=["en"])
-    except Exception as e:
-        logger.error(f"Failed to initialize OCR service: {e}")
-        return
+    # Skip PDFs that already have an output (any timestamp) before scheduling work
+    done = _already_processed(output_dir)
+    todo = [pdf_path for pdf_path in pdf_files if f"{_safe_name(pdf_path.name)}.json" not in done]
+    skipped = total_files - len(todo)
+    if skipped:
+        logger.info(f"Skipping {skipped} PDFs already processed in {output_dir}")
     
-    # Process each PDF
     successful = 0
     failed = 0
-    skipped = 0
     
-    for i, pdf_path in enumerate(pdf_files, 1):
-        try:
-            # Create safe filename for output
-            safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "_", pdf_path.name)
-            timestamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
-            output_filename = f"{timestamp}_{safe_name}.json"
-            output_path = output_dir / output_filename
-            
-            # Check if already processed
-            if output_path.exists():
-                logger.info(f"[{i}/{total_files}] SKIPPED (already exists): {pdf_path.name}")
-                skipped += 1
-                continue
-            
-            logger.info(f"[{i}/{total_files}] Processing: {pdf_path.name}")
-            
-            # Run OCR extraction
-            result = ocr_service.extract_from_pdf(
-                pdf_path=pdf_path,
-                languages=["en"],
-                include_raw=False  # Set to True if you want raw Surya output
-            )
-            
-            # Save result as JSON
-            payload = json.loads(result.model_dump_json(by_alias=True))
-            
-            with output_path.open("w", encoding="utf-8") as f:
-                json.dump(payload, f, indent=2, ensure_ascii=False)
-            
-            logger.info(f"[{i}/{total_files}] ✓ SUCCESS: Saved to {output_filename}")
+    def log_outcome(i: int, pdf_path: Path, status: str, detail: str):
+        nonlocal successful, failed
+        if status == "success":
+            logger.info(f"[{i}/{total_files}] ✓ SUCCESS: {pdf_path.name} saved to {detail}")
             successful += 1
-            
-        except Exception as e:
-            logger.error(f"[{i}/{total_files}] ✗ FAILED: {pdf_path.name} - Error: {e}")
+        else:
+            logger.error(f"[{i}/{total_files}] ✗ FAILED: {pdf_path.name} - Error: {detail}")
             failed += 1
-            continue
+    
+    if max_workers <= 1:
+        # One OCR service, loaded up front, handles every PDF in this process
+        logger.info("Initializing Surya OCR service...")
+        try:
+            _get_ocr_service()
+        except Exception as e:
+            logger.error(f"Failed to initialize OCR service: {e}")
+            return
+        for i, pdf_path in enumerate(todo, skipped + 1):
+            logger.info(f"[{i}/{total_files}] Processing: {pdf_path.name}")
+            log_outcome(i, pdf_path, *process_one(pdf_path, output_dir))
+    else:
+        # Each worker process loads its own OCR models on first use; results are logged as they finish
+        logger.info(f"Running Surya OCR in {max_workers} worker processes...")
+        num_threads = max(1, (os.cpu_count() or 1) // max_workers)
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(num_threads,)
+        ) as executor:
+            futures = {
+                executor.submit(process_one, pdf_path, output_dir): pdf_path
+                for pdf_path in todo
+            }
+            for i, future in enumerate(as_completed(futures), skipped + 1):
+                try:
+                    status, detail = future.result()
+                except BrokenProcessPool as e:
+                    # A worker died (e.g. killed for running out of memory); the PDFs it left unfinished fail
+                    status, detail = "failed", f"OCR worker process died: {e}"
+                log_outcome(i, futures[future], status, detail)
     
     # Print summary
     logger.info("=" * 70)